@@ -1,11 +1,19 @@
 
+import os
 import json
+import pickle
+import hashlib
+from concurrent.futures import ThreadPoolExecutor
 from pathlib import Path
 from typing import List, Dict, Any, Optional
 
 from .search_engine import BrainSearchEngine
 from .formatters import BrainResponseFormatter
 
+# Parsed knowledge base, so restarts can skip parsing unchanged JSON files.
+# Anchored to the backend directory so it doesn't depend on the working directory.
+CACHE_DIR = Path(__file__).resolve().parent.parent / "data"
+
 class ALUBrainManager:
     """
     Manages the ALU Brain JSON knowledge base:
@@ -31,17 +39,67 @@ class ALUBrainManager:
         if not json_files:
             print(f"Warning: No JSON files found in {self.brain_dir}")
             return
+        
+        # Each brain directory has its own caches, and a cache is only valid
+        # for exactly these files, unmodified
+        brain_key = hashlib.blake2b(str(self.brain_dir.resolve()).encode(), digest_size=8).hexdigest()
+        signature = hashlib.blake2b(
+            str(sorted((p.name, p.stat().st_mtime_ns, p.stat().st_size) for p in json_files)).encode(),
+            digest_size=16
+        ).hexdigest()
+        cache_path = CACHE_DIR / f"alu_brain.{brain_key}.{signature}.pkl"
+        
+        if cache_path.exists():
+            try:
+                self.knowledge_base = pickle.loads(cache_path.read_bytes())
+                print(f"Loaded {len(self.knowledge_base)} categories from cache")
+                return
+            except Exception as e:
+                print(f"Error loading ALU Brain cache {cache_path}: {e}")
+            
+        # Read the files concurrently, but fill the knowledge base in file order
+        with ThreadPoolExecutor(max_workers=min(8, len(json_files))) as executor:
+            loaded = list(executor.map(self._read_json, json_files))
             
-        for json_path in json_files:
+        for json_path, (data, error) in zip(json_files, loaded):
             try:
-                with open(json_path, 'r', encoding='utf-8') as f:
-                    data = json.load(f)
-                    category = data.get('category')
-                    if category and 'entries' in data:
-                        self.knowledge_base[category] = data
-                        print(f"Loaded {len(data['entries'])} entries from {json_path.name}")
+                if error is not None:
+                    raise error
+                category = data.get('category')
+                if category and 'entries' in data:
+                    self.knowledge_base[category] = data
+                    print(f"Loaded {len(data['entries'])} entries from {json_path.name}")
             except Exception as e:
                 print(f"Error loading {json_path}: {e}")
+        
+        self._save_cache(cache_path, f"alu_brain.{brain_key}.*.pkl")
+    
+    @staticmethod
+    def _read_json(json_path: Path):
+        """Parse one JSON file, returning (data, None) or (None, the exception)"""
+        try:
+            with open(json_path, 'r', encoding='utf-8') as f:
+                return json.load(f), None
+        except Exception as e:
+            return None, e
+    
+    def _save_cache(self, cache_path: Path, stale_pattern: str):
+        """Pickle the knowledge base for the next start-up and remove stale caches matching stale_pattern"""
+        try:
+            cache_path.parent.mkdir(parents=True, exist_ok=True)
+            # Workers start together, so each writes its own temp file and
+            # atomically swaps it in; readers never see a partial cache
+            tmp_path = cache_path.with_name(f"{cache_path.name}.{os.getpid()}.tmp")
+            tmp_path.write_bytes(pickle.dumps(self.knowledge_base, protocol=pickle.HIGHEST_PROTOCOL))
+            os.replace(tmp_path, cache_path)
+            
+            # Finished caches for other versions of this directory's files are
+            # stale; temp files still being written don't match the pattern
+            for old_cache in cache_path.parent.glob(stale_pattern):
+                if old_cache != cache_path:
+                    old_cache.unlink(missing_ok=True)
+        except Exception as e:
+            print(f"Error saving ALU Brain cache {cache_path}: {e}")
     
     def search(self, query: str, top_k: int = 5) -> List[Dict[str, Any]]:
         """Search in the knowledge base using the search engine"""
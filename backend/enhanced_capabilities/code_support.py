@@ -1,62 +1,124 @@
 import re
 import ast
-from typing import Dict, Any, List, Tuple, Optional
-import difflib
-from duckduckgo_search import DDGS
+import time
+import functools
+import threading
+from typing import Dict, Any, List, Set, Tuple, Optional, Union
+
+# Patterns are compiled once at import time so the classifiers below don't
+# go through the re module's cache on every call.
+
+# Keywords that suggest a code question, lowercased and de-duplicated once here
+_CODE_KEYWORDS = tuple(dict.fromkeys(keyword.lower() for keyword in [
+    "code", "function", "algorithm", "syntax", "error", "debug",
+    "compile", "runtime", "python", "javascript", "java", "c++", "html",
+    "css", "sql", "program", "variable", "class", "object", "method",
+    "array", "list", "dictionary", "loop", "if statement", "condition",
+    "exception", "try", "catch", "import", "module", "library",
+    "fetch", "api", "request", "response", "html", "tag", "element"
+]))
+# Plain substring match against the lowercased question, like `in`
+_CODE_KEYWORDS_RE = re.compile('|'.join(re.escape(keyword) for keyword in _CODE_KEYWORDS))
+
+# Common code patterns, folded into one alternation so a single scan decides.
+# Only a yes/no answer is needed, so the wildcards are lazy: they stop at the
+# first terminator instead of running to the end of the line and backtracking.
+_CODE_PATTERN_RE = re.compile('|'.join(f'(?:{pattern})' for pattern in [
+    r'def\s+\w+\s*\(', # Python function definition
+    r'function\s+\w+\s*\(', # JavaScript function definition
+    r'class\s+\w+', # Class definition
+    r'for\s+\w+\s+in\s+', # Python for loop
+    r'if\s+.+?:', # Python if statement
+    r'import\s+\w+', # Import statement
+    r'from\s+\w+\s+import', # Python from import
+    r'<\w+>.*?</\w+>', # HTML tags
+    r'<\w+[^>]*>', # HTML opening tags
+    r'SELECT\s+.+?\s+FROM\s+', # SQL query
+    r'var\s+\w+\s*=', # JavaScript var declaration
+    r'let\s+\w+\s*=', # JavaScript let declaration
+    r'const\s+\w+\s*=' # JavaScript const declaration
+]), re.IGNORECASE)
+
+# Request keywords checked by handle_code_question (substring match on the
+# lowercased question)
+_HTML_TEMPLATE_WORDS_RE = re.compile(r'code|basic|template|boilerplate')
+_PYTHON_EXAMPLE_WORDS_RE = re.compile(r'code|basic|example')
+_GENERATE_WORDS_RE = re.compile(r'generate|create|write|make')
+_HTML_ISSUE_WORDS_RE = re.compile(r'wrong|fix|error|issue')
+_EXPLAIN_WORDS_RE = re.compile(r'explain|how does|what is|how to')
+
+# Code block extraction
+_FENCED_LANG_RE = re.compile(r'```(\w*)\n(.*?)\n```', re.DOTALL)
+_FENCED_RE = re.compile(r'```(.*?)```', re.DOTALL)
+_INLINE_CODE_RE = re.compile(r'`(.*?)`')
+_HTML_BLOCK_RE = re.compile(r'(<[^>]+>.*?</[^>]+>)', re.DOTALL)
+
+# Language heuristics used by guess_language (lazy wildcards, as above)
+_PYTHON_RE = re.compile(
+    r'def\s+\w+\s*\(.*?\):|import\s+\w+|from\s+\w+\s+import|if\s+.*?:'
+    r'|for\s+.*?\s+in\s+.*?:|class\s+\w+.*?:'
+)
+_JAVASCRIPT_RE = re.compile(
+    r'function\s+\w+\s*\(.*?\)|const\s+\w+\s*=|let\s+\w+\s*=|var\s+\w+\s*='
+    r'|export\s+class|=>'
+)
+_JAVA_RE = re.compile(r'public\s+static\s+void\s+main|public\s+class\s+\w+')
+_C_RE = re.compile(
+    r'#include\s*<\w+\.h>|int\s+main\s*\(\s*void\s*\)'
+    r'|int\s+main\s*\(\s*int\s+argc,\s*char\s*\*\s*argv\[\]\s*\)'
+)
+_SQL_RE = re.compile(r'SELECT\s+.*?\s+FROM\s+|INSERT\s+INTO|CREATE\s+TABLE', re.IGNORECASE)
+
+# Python fixers
+_COLON_KEYWORDS = frozenset(['if', 'elif', 'else', 'for', 'while', 'def', 'class', 'with', 'try', 'except', 'finally'])
+_UNQUOTED_ASSIGN_RE = re.compile(r'=\s*(\w+)$')
+_NON_BRACKET_RE = re.compile(r'[^()\[\]{}]+')
+
+# HTML analysis
+_HTML_TAG_RE = re.compile(r'<(/?)(\w+)[^>]*>')  # opening and closing tags in one pass
+_HTML_VOID_TAGS = frozenset(['img', 'br', 'hr', 'input', 'meta', 'link'])
+_HTML_UNQUOTED_ATTR_RE = re.compile(r'<\w+\s+[^>]*=\s*[^\'"][^\s>]*[^\'"][^>]*>')
 
 def is_code_question(question: str) -> bool:
     """Determine if a question is related to code."""
-    code_keywords = [
-        "code", "function", "algorithm", "syntax", "error", "debug", 
-        "compile", "runtime", "python", "javascript", "java", "c++", "html", 
-        "css", "sql", "program", "variable", "class", "object", "method",
-        "array", "list", "dictionary", "loop", "if statement", "condition",
-        "exception", "try", "catch", "import", "module", "library",
-        "fetch", "api", "request", "response", "html", "tag", "element"
-    ]
+    return _is_code_question_lowered(question.lower())
+
+@functools.lru_cache(maxsize=512)
+def _is_code_question_lowered(question: str) -> bool:
+    """is_code_question for a question that has already been lowercased."""
+    # Check for code block markers first - it's the cheapest test
+    # ('`' also covers '```')
+    if '`' in question:
+        return True
     
     # Check if any code keywords are in the question
-    has_keywords = any(keyword.lower() in question.lower() for keyword in code_keywords)
-    
-    # Check for code block markers
-    has_code_blocks = '```' in question or '`' in question
+    if _CODE_KEYWORDS_RE.search(question):
+        return True
     
     # Check for common code patterns
-    code_patterns = [
-        r'def\s+\w+\s*\(', # Python function definition
-        r'function\s+\w+\s*\(', # JavaScript function definition
-        r'class\s+\w+', # Class definition
-        r'for\s+\w+\s+in\s+', # Python for loop
-        r'if\s+.+:', # Python if statement
-        r'import\s+\w+', # Import statement
-        r'from\s+\w+\s+import', # Python from import
-        r'<\w+>.*</\w+>', # HTML tags
-        r'<\w+[^>]*>', # HTML opening tags
-        r'SELECT\s+.+\s+FROM\s+', # SQL query
-        r'var\s+\w+\s*=', # JavaScript var declaration
-        r'let\s+\w+\s*=', # JavaScript let declaration
-        r'const\s+\w+\s*=' # JavaScript const declaration
-    ]
-    
-    has_code_patterns = any(re.search(pattern, question, re.IGNORECASE) for pattern in code_patterns)
-    
-    return has_keywords or has_code_blocks or has_code_patterns
+    return _CODE_PATTERN_RE.search(question) is not None
 
 def extract_code(text: str) -> List[Tuple[str, str]]:
     """Extract code blocks from text with their language."""
-    # Extract markdown code blocks with language specification
-    code_blocks = re.findall(r'```(\w*)\n(.*?)\n```', text, re.DOTALL)
-    
-    # If no code blocks with language specification were found,
-    # look for code blocks without language specification
-    if not code_blocks:
-        unlabeled_blocks = re.findall(r'```(.*?)```', text, re.DOTALL)
-        code_blocks = [('', block.strip()) for block in unlabeled_blocks]
-    
-    # If still no code blocks, look for inline code
-    if not code_blocks:
-        inline_code = re.findall(r'`(.*?)`', text)
-        code_blocks = [('', code.strip()) for code in inline_code]
+    code_blocks: List[Tuple[str, str]] = []
+    
+    # All three markdown forms need a backtick, so plain questions (the common
+    # case) skip straight to the indentation/HTML heuristics below
+    if '`' in text:
+        if '```' in text:
+            # Extract markdown code blocks with language specification
+            code_blocks = _FENCED_LANG_RE.findall(text)
+            
+            # If no code blocks with language specification were found,
+            # look for code blocks without language specification
+            if not code_blocks:
+                unlabeled_blocks = _FENCED_RE.findall(text)
+                code_blocks = [('', block.strip()) for block in unlabeled_blocks]
+        
+        # If still no code blocks, look for inline code
+        if not code_blocks:
+            inline_code = _INLINE_CODE_RE.findall(text)
+            code_blocks = [('', code.strip()) for code in inline_code]
         
     # If still nothing, try to find code-like patterns
     if not code_blocks:
@@ -76,55 +138,44 @@ def extract_code(text: str) -> List[Tuple[str, str]]:
 
         # Look for HTML-like content
         if '<' in text and '>' in text:
-            html_tags = re.findall(r'(<[^>]+>.*?</[^>]+>)', text, re.DOTALL)
+            html_tags = _HTML_BLOCK_RE.findall(text)
             if html_tags:
                 code_blocks.append(('html', html_tags[0]))
             
     return code_blocks
 
+@functools.lru_cache(maxsize=512)
 def guess_language(code: str) -> str:
     """Guess the programming language of a code snippet."""
-    # Simple heuristics to identify common languages
+    # Simple heuristics to identify common languages. Each regex is guarded by
+    # substrings it can't match without, so most snippets are decided by
+    # plain `in` tests and only the plausible languages run a regex.
     # Python patterns
-    if re.search(r'def\s+\w+\s*\(.*\):', code) or \
-       re.search(r'import\s+\w+', code) or \
-       re.search(r'from\s+\w+\s+import', code) or \
-       re.search(r'if\s+.*:', code) or \
-       re.search(r'for\s+.*\s+in\s+.*:', code) or \
-       re.search(r'class\s+\w+.*:', code):
+    if ('import' in code or (':' in code and ('def' in code or 'if' in code or 'for' in code or 'class' in code))) \
+            and _PYTHON_RE.search(code):
         return 'python'
     
     # JavaScript patterns
-    elif re.search(r'function\s+\w+\s*\(.*\)', code) or \
-         re.search(r'const\s+\w+\s*=', code) or \
-         re.search(r'let\s+\w+\s*=', code) or \
-         re.search(r'var\s+\w+\s*=', code) or \
-         re.search(r'export\s+class', code) or \
-         re.search(r'=>', code):
+    elif ('=>' in code or 'function' in code or 'const' in code or 'let' in code or 'var' in code or 'export' in code) \
+            and _JAVASCRIPT_RE.search(code):
         return 'javascript'
     
     # Java patterns
-    elif re.search(r'public\s+static\s+void\s+main', code) or \
-         re.search(r'public\s+class\s+\w+', code):
+    elif 'public' in code and _JAVA_RE.search(code):
         return 'java'
     
     # C/C++ patterns
-    elif re.search(r'#include\s*<\w+\.h>', code) or \
-         re.search(r'int\s+main\s*\(\s*void\s*\)', code) or \
-         re.search(r'int\s+main\s*\(\s*int\s+argc,\s*char\s*\*\s*argv\[\]\s*\)', code):
+    elif ('#include' in code or 'main' in code) and _C_RE.search(code):
         return 'c/c++'
     
+    code_lower = code.lower()
+    
     # HTML patterns
-    elif re.search(r'<html>', code, re.IGNORECASE) or \
-         re.search(r'<body>', code, re.IGNORECASE) or \
-         re.search(r'<div', code, re.IGNORECASE) or \
-         re.search(r'<p>', code, re.IGNORECASE):
+    if '<html>' in code_lower or '<body>' in code_lower or '<div' in code_lower or '<p>' in code_lower:
         return 'html'
     
     # SQL patterns
-    elif re.search(r'SELECT\s+.*\s+FROM\s+', code, re.IGNORECASE) or \
-         re.search(r'INSERT\s+INTO', code, re.IGNORECASE) or \
-         re.search(r'CREATE\s+TABLE', code, re.IGNORECASE):
+    elif ('select' in code_lower or 'insert' in code_lower or 'create' in code_lower) and _SQL_RE.search(code):
         return 'sql'
     
     # Default to Python for code blocks with indentation and common Python syntax
@@ -134,17 +185,75 @@ def guess_language(code: str) -> str:
         
     return 'unknown'
 
+@functools.lru_cache(maxsize=256)
+def _parse_python(code: str) -> ast.Module:
+    """Parse Python source, reusing the tree for snippets seen recently.
+
+    The returned tree is shared between callers and must not be mutated.
+    """
+    return ast.parse(code)
+
+class _StructureVisitor(ast.NodeVisitor):
+    """Collect functions, classes, imports, methods and returns in one traversal."""
+    
+    def __init__(self) -> None:
+        self.functions: List[ast.FunctionDef] = []
+        self.classes: List[ast.ClassDef] = []
+        self.imports: List[Union[ast.Import, ast.ImportFrom]] = []
+        self.methods: Dict[ast.ClassDef, List[str]] = {}  # ClassDef -> names of functions defined inside it
+        self.returning_functions: Set[ast.FunctionDef] = set()  # FunctionDefs containing a return
+        self._open_functions: List[ast.FunctionDef] = []
+        self._open_classes: List[ast.ClassDef] = []
+    
+    def visit_FunctionDef(self, node: ast.FunctionDef) -> None:
+        self.functions.append(node)
+        for cls in self._open_classes:
+            self.methods[cls].append(node.name)
+        
+        self._open_functions.append(node)
+        self.generic_visit(node)
+        self._open_functions.pop()
+    
+    def visit_ClassDef(self, node: ast.ClassDef) -> None:
+        self.classes.append(node)
+        self.methods[node] = []
+        
+        self._open_classes.append(node)
+        self.generic_visit(node)
+        self._open_classes.pop()
+    
+    def visit_Import(self, node: ast.Import) -> None:
+        self.imports.append(node)
+    
+    def visit_ImportFrom(self, node: ast.ImportFrom) -> None:
+        self.imports.append(node)
+    
+    def visit_Return(self, node: ast.Return) -> None:
+        self.returning_functions.update(self._open_functions)
+
+def _collect_structure(tree: ast.AST) -> _StructureVisitor:
+    """Collect the structure of a parsed tree."""
+    visitor = _StructureVisitor()
+    visitor.visit(tree)
+    return visitor
+
 def analyze_python_code(code: str) -> Dict[str, Any]:
-    """Analyze Python code to extract structure information."""
+    """Analyze the top-level structure of Python code (imports, functions, classes and their methods)."""
     try:
-        tree = ast.parse(code)
+        tree = _parse_python(code)
         
-        functions = [node.name for node in ast.walk(tree) if isinstance(node, ast.FunctionDef)]
-        classes = [node.name for node in ast.walk(tree) if isinstance(node, ast.ClassDef)]
-        imports = []
-        
-        for node in ast.walk(tree):
-            if isinstance(node, ast.Import):
+        # Only module-level statements are scanned, plus class bodies for
+        # methods, so the cost follows the module's length, not its AST size
+        functions: List[str] = []
+        classes: List[str] = []
+        imports: List[str] = []
+        for node in ast.iter_child_nodes(tree):
+            if isinstance(node, ast.FunctionDef):
+                functions.append(node.name)
+            elif isinstance(node, ast.ClassDef):
+                classes.append(node.name)
+                functions.extend(child.name for child in node.body if isinstance(child, ast.FunctionDef))
+            elif isinstance(node, ast.Import):
                 imports.extend(alias.name for alias in node.names)
             elif isinstance(node, ast.ImportFrom):
                 imports.append(f"{node.module} (from)")
@@ -170,22 +279,27 @@ def analyze_python_code(code: str) -> Dict[str, Any]:
 
 def fix_common_python_errors(code: str) -> Tuple[str, List[str]]:
     """Fix common Python syntax errors."""
-    original_code = code
     fixes = []
     
+    # The fixes below all edit this list of lines in place, so the code is
+    # split once here and joined once at the end
+    lines = code.split('\n')
+    
     # Fix 1: Missing colons after if/for/while/def statements
-    def add_missing_colons(code):
-        lines = code.split('\n')
+    def add_missing_colons(lines: List[str]) -> Optional[str]:
         for i, line in enumerate(lines):
-            # Check for control structures without colons
-            if re.search(r'^\s*(if|elif|else|for|while|def|class|with|try|except|finally)\s+.*[^\s:]$', line):
+            # Check for control structures without colons: a block keyword
+            # followed by more text that doesn't end in a colon
+            if not line or line[-1] == ':' or line[-1].isspace():
+                continue
+            words = line.split(None, 1)
+            if len(words) == 2 and words[0] in _COLON_KEYWORDS:
                 lines[i] = line + ':'
-                return '\n'.join(lines), f"Added missing colon at line {i+1}"
-        return code, None
+                return f"Added missing colon at line {i+1}"
+        return None
     
     # Fix 2: Indentation errors
-    def fix_indentation(code):
-        lines = code.split('\n')
+    def fix_indentation(lines: List[str]) -> Optional[str]:
         fixed_lines = []
         
         # Simple heuristic: ensure consistent indentation of 4 spaces
@@ -199,7 +313,7 @@ def fix_common_python_errors(code: str) -> Tuple[str, List[str]]:
                 continue
                 
             # Lines that typically increase indentation
-            if re.search(r':\s*$', line):
+            if line.rstrip().endswith(':'):
                 fixed_lines.append(' ' * current_indent + stripped)
                 current_indent += 4
             # Lines that typically decrease indentation
@@ -210,17 +324,25 @@ def fix_common_python_errors(code: str) -> Tuple[str, List[str]]:
             else:
                 fixed_lines.append(' ' * current_indent + stripped)
                 
-        fixed_code = '\n'.join(fixed_lines)
-        if fixed_code != code:
-            return fixed_code, "Fixed inconsistent indentation"
-        return code, None
+        if fixed_lines != lines:
+            lines[:] = fixed_lines
+            return "Fixed inconsistent indentation"
+        return None
     
     # Fix 3: Unmatched parentheses/brackets/braces
-    def fix_unmatched_brackets(code):
+    def fix_unmatched_brackets(lines: List[str]) -> Optional[str]:
         brackets = {'(': ')', '[': ']', '{': '}'}
         stack = []
         
-        for char in code:
+        # Strip everything but brackets in C so the Python loop only sees those;
+        # the stack (not per-type counts) keeps the closers in nesting order
+        bracket_chars = ''.join(_NON_BRACKET_RE.sub('', line) for line in lines)
+        
+        # Nothing to close without an opening bracket
+        if '(' not in bracket_chars and '[' not in bracket_chars and '{' not in bracket_chars:
+            return None
+        
+        for char in bracket_chars:
             if char in brackets.keys():
                 stack.append(char)
             elif char in brackets.values():
@@ -229,50 +351,48 @@ def fix_common_python_errors(code: str) -> Tuple[str, List[str]]:
                     pass
         
         if stack:
-            # Add missing closing brackets
-            fixed_code = code
-            for bracket in reversed(stack):
-                fixed_code += brackets[bracket]
-            return fixed_code, f"Added missing {len(stack)} closing bracket(s)"
+            # Add missing closing brackets to the end of the code
+            lines[-1] += ''.join(brackets[bracket] for bracket in reversed(stack))
+            return f"Added missing {len(stack)} closing bracket(s)"
         
-        return code, None
+        return None
     
     # Fix 4: Missing quotes in strings
-    def fix_missing_quotes(code):
-        lines = code.split('\n')
+    def fix_missing_quotes(lines: List[str]) -> Optional[str]:
         for i, line in enumerate(lines):
             # Look for string assignments without proper quotes
-            match = re.search(r'=\s*(\w+)$', line)
+            match = _UNQUOTED_ASSIGN_RE.search(line)
             if match and match.group(1) not in ['True', 'False', 'None']:
                 potential_string = match.group(1)
                 lines[i] = line.replace(potential_string, f'"{potential_string}"')
-                return '\n'.join(lines), f"Added missing quotes around '{potential_string}' at line {i+1}"
-        return code, None
+                return f"Added missing quotes around '{potential_string}' at line {i+1}"
+        return None
     
     # Apply fixes
     for fix_func in [add_missing_colons, fix_indentation, fix_unmatched_brackets, fix_missing_quotes]:
-        code, message = fix_func(code)
+        message = fix_func(lines)
         if message:
             fixes.append(message)
     
     # If we couldn't fix it with our simple heuristics, return the original
     if not fixes:
-        return original_code, []
+        return code, []
     
-    return code, fixes
+    return '\n'.join(lines), fixes
 
 def explain_python_code(code: str) -> str:
     """Generate an explanation for Python code."""
     try:
         explanation = []
-        tree = ast.parse(code)
+        tree = _parse_python(code)
+        structure = _collect_structure(tree)
         
         # Get imports
-        imports = []
-        for node in ast.walk(tree):
+        imports: List[str] = []
+        for node in structure.imports:
             if isinstance(node, ast.Import):
                 imports.extend(alias.name for alias in node.names)
-            elif isinstance(node, ast.ImportFrom):
+            else:
                 imports.append(f"{node.module}")
                 
         if imports:
@@ -280,31 +400,22 @@ def explain_python_code(code: str) -> str:
             explanation.append("This code imports the following modules: " + ", ".join(imports) + ".")
         
         # Analyze functions
-        functions = [node for node in ast.walk(tree) if isinstance(node, ast.FunctionDef)]
-        if functions:
+        if structure.functions:
             explanation.append("\n**Functions:**")
-            for func in functions:
+            for func in structure.functions:
                 args = [arg.arg for arg in func.args.args]
                 explanation.append(f"- `{func.name}({', '.join(args)})`: ")
                 
                 # Try to determine what the function does
-                func_operations = []
-                for node in ast.walk(func):
-                    if isinstance(node, ast.Return):
-                        func_operations.append("returns a value")
-                        break
-                
-                func_body = ast.unparse(func).split(':', 1)[1].strip()
-                if func_operations:
-                    explanation.append(f"  This function {' and '.join(func_operations)}.")
+                if func in structure.returning_functions:
+                    explanation.append("  This function returns a value.")
                 else:
                     explanation.append(f"  This function takes {len(args)} parameter(s).")
         
         # Analyze classes
-        classes = [node for node in ast.walk(tree) if isinstance(node, ast.ClassDef)]
-        if classes:
+        if structure.classes:
             explanation.append("\n**Classes:**")
-            for cls in classes:
+            for cls in structure.classes:
                 base_names = [ast.unparse(base) for base in cls.bases]
                 if base_names:
                     explanation.append(f"- `{cls.name}`: A class that inherits from {', '.join(base_names)}.")
@@ -312,7 +423,7 @@ def explain_python_code(code: str) -> str:
                     explanation.append(f"- `{cls.name}`: A class definition.")
                 
                 # Look for methods
-                methods = [node.name for node in ast.walk(cls) if isinstance(node, ast.FunctionDef)]
+                methods = structure.methods[cls]
                 if methods:
                     explanation.append(f"  It has the following methods: {', '.join(methods)}.")
         
@@ -347,14 +458,38 @@ def explain_python_code(code: str) -> str:
         explanation.append("(Note: I couldn't fully parse the code structure.)")
         return "\n".join(explanation)
 
+# Online search results, keyed by query: query -> (timestamp, result)
+# Questions are answered on threadpool threads, so access goes through the lock
+_search_cache: Dict[str, Tuple[float, Dict[str, Any]]] = {}
+_search_cache_lock = threading.Lock()
+_SEARCH_CACHE_TTL = 3600  # 1 hour
+_SEARCH_CACHE_SIZE = 256
+
+# DuckDuckGo clients, one per thread, created on first use and reused between
+# that thread's searches. duckduckgo_search is imported lazily so importing
+# this module stays cheap for the many questions that never search online.
+_local = threading.local()
+
+def _get_ddgs() -> Any:
+    """Return this thread's DuckDuckGo search client."""
+    ddgs = getattr(_local, "ddgs", None)
+    if ddgs is None:
+        from duckduckgo_search import DDGS
+        ddgs = _local.ddgs = DDGS()
+    return ddgs
+
 def search_code_solutions(query: str) -> Dict[str, Any]:
     """Search for code solutions online."""
+    with _search_cache_lock:
+        cached = _search_cache.get(query)
+    if cached and time.time() - cached[0] < _SEARCH_CACHE_TTL:
+        return cached[1]
+    
     # Add "code" and "example" to the query to get more relevant results
     search_query = f"{query} code example"
     
     try:
-        with DDGS() as ddgs:
-            results = list(ddgs.text(search_query, max_results=5))
+        results = list(_get_ddgs().text(search_query, max_results=5))
         
         if not results:
             return {
@@ -369,12 +504,21 @@ def search_code_solutions(query: str) -> Dict[str, Any]:
         # Extract titles for better context
         titles = [result.get('title', 'Resource') for result in results]
         
-        return {
+        result = {
             "found": True,
             "snippets": snippets,
             "links": links,
             "titles": titles
         }
+        
+        # Only successful searches are cached; drop the oldest entry when full
+        with _search_cache_lock:
+            _search_cache.pop(query, None)
+            if len(_search_cache) >= _SEARCH_CACHE_SIZE:
+                del _search_cache[next(iter(_search_cache))]
+            _search_cache[query] = (time.time(), result)
+        
+        return result
     
     except Exception as e:
         return {
@@ -390,8 +534,8 @@ def handle_code_question(question: str) -> Dict[str, Any]:
     question_lower = question.lower()
     
     # Handle specific code generation requests
-    if "html" in question_lower and any(word in question_lower for word in ["code", "basic", "template", "boilerplate"]):
-        language, code = generate_simple_code("html template")
+    if "html" in question_lower and _HTML_TEMPLATE_WORDS_RE.search(question_lower):
+        language, code = _SNIPPETS["html_template"]
         return {
             "answer": f"Here's a basic HTML template:",
             "language": language,
@@ -399,8 +543,8 @@ def handle_code_question(question: str) -> Dict[str, Any]:
             "type": "generate"
         }
         
-    elif "python" in question_lower and any(word in question_lower for word in ["code", "basic", "example"]):
-        language, code = generate_simple_code("python example")
+    elif "python" in question_lower and _PYTHON_EXAMPLE_WORDS_RE.search(question_lower):
+        language, code = _SNIPPETS["python_greeting"]
         return {
             "answer": f"Here's a simple Python example:",
             "language": language,
@@ -410,11 +554,9 @@ def handle_code_question(question: str) -> Dict[str, Any]:
     
     # Rest of your existing function...
     # If no code blocks found but it's a code question, look for keywords
-    if not code_blocks and is_code_question(question):
-        question_lower = question.lower()
-        
+    if not code_blocks and _is_code_question_lowered(question_lower):
         # Check if this is a request to generate code
-        if any(keyword in question_lower for keyword in ["generate", "create", "write", "make"]):
+        if _GENERATE_WORDS_RE.search(question_lower):
             language, code = generate_simple_code(question)
             return {
                 "answer": f"Here's a {language} code example that might help:",
@@ -425,7 +567,7 @@ def handle_code_question(question: str) -> Dict[str, Any]:
         
         # Special case for JavaScript API fetch
         elif "fetch" in question_lower and ("api" in question_lower or "javascript" in question_lower):
-            language, code = generate_simple_code("fetch api javascript")
+            language, code = _SNIPPETS["javascript_fetch"]
             return {
                 "answer": f"Here's how to fetch data from an API in JavaScript:",
                 "language": "javascript",
@@ -434,14 +576,14 @@ def handle_code_question(question: str) -> Dict[str, Any]:
             }
         
         # Special case for HTML issues
-        elif "html" in question_lower and any(word in question_lower for word in ["wrong", "fix", "error", "issue"]):
+        elif "html" in question_lower and _HTML_ISSUE_WORDS_RE.search(question_lower):
             return {
                 "answer": "Common HTML errors include:\n\n1. Mismatched tags (opening and closing tags don't match)\n2. Missing closing tags\n3. Incorrect nesting of elements\n4. Invalid attributes\n5. Duplicate IDs\n\nTo fix HTML issues, ensure all tags are properly closed and nested correctly.",
                 "type": "explain"
             }
             
         # Check if this is a request to explain a programming concept
-        elif any(keyword in question_lower for keyword in ["explain", "how does", "what is", "how to"]):
+        elif _EXPLAIN_WORDS_RE.search(question_lower):
             # Search online for code examples related to the concept
             search_results = search_code_solutions(question)
             
@@ -472,11 +614,12 @@ def handle_code_question(question: str) -> Dict[str, Any]:
         language, code = code_blocks[0]
         
         # If language wasn't specified, try to guess it
+        guessed_language = guess_language(code)
         if not language:
-            language = guess_language(code)
+            language = guessed_language
         
         # For Python code, we can do more analysis
-        if language.lower() == 'python' or guess_language(code) == 'python':
+        if language.lower() == 'python' or guessed_language == 'python':
             # Check if it has syntax errors
             analysis = analyze_python_code(code)
             
@@ -487,13 +630,6 @@ def handle_code_question(question: str) -> Dict[str, Any]:
                 if fixes:
                     explanation = explain_python_code(fixed_code)
                     
-                    diff = list(difflib.unified_diff(
-                        code.splitlines(keepends=True),
-                        fixed_code.splitlines(keepends=True),
-                        fromfile='original',
-                        tofile='fixed'
-                    ))
-                    
                     return {
                         "answer": f"I found and fixed these issues in your code:\n- " + "\n- ".join(fixes),
                         "explanation": explanation,
@@ -520,7 +656,7 @@ def handle_code_question(question: str) -> Dict[str, Any]:
                     "type": "explain"
                 }
         # For HTML code, provide error analysis
-        elif language.lower() == 'html' or guess_language(code) == 'html':
+        elif language.lower() == 'html' or guessed_language == 'html':
             html_analysis = analyze_html_errors(code)
             
             if html_analysis["has_errors"]:
@@ -552,13 +688,9 @@ def handle_code_question(question: str) -> Dict[str, Any]:
         "type": "fallback"
     }
 
-def generate_simple_code(request: str) -> Tuple[str, str]:
-    """Generate simple code snippets based on the request."""
-    request_lower = request.lower()
-    
-    # JavaScript API fetch function
-    if "fetch api javascript" in request_lower or ("api" in request_lower and "fetch" in request_lower):
-        return "javascript", """// Function to fetch data from an API
+# Snippets returned by generate_simple_code, keyed by name
+_SNIPPETS = {
+    "javascript_fetch": ("javascript", """// Function to fetch data from an API
 async function fetchData(url) {
     try {
         const response = await fetch(url);
@@ -593,11 +725,8 @@ async function displayData() {
 
 // Call the function
 displayData();
-"""
-    
-    # Python function to check if a number is prime
-    elif "prime" in request_lower and ("check" in request_lower or "number" in request_lower):
-        return "python", """def is_prime(n):
+"""),
+    "python_prime": ("python", """def is_prime(n):
     \"\"\"Check if a number is prime.\"\"\"
     if n <= 1:
         return False
@@ -618,11 +747,8 @@ if is_prime(number):
     print(f"{number} is a prime number")
 else:
     print(f"{number} is not a prime number")
-"""
-    
-    # Python function to calculate factorial
-    elif "factorial" in request_lower:
-        return "python", """def factorial(n):
+"""),
+    "python_factorial": ("python", """def factorial(n):
     \"\"\"Calculate the factorial of n.\"\"\"
     if n == 0 or n == 1:
         return 1
@@ -632,11 +758,8 @@ else:
 # Example usage
 number = 5
 print(f"The factorial of {number} is {factorial(number)}")
-"""
-    
-    # Python function to find the Fibonacci sequence
-    elif "fibonacci" in request_lower:
-        return "python", """def fibonacci(n):
+"""),
+    "python_fibonacci": ("python", """def fibonacci(n):
     \"\"\"Generate the Fibonacci sequence up to the nth term.\"\"\"
     sequence = []
     a, b = 0, 1
@@ -648,11 +771,8 @@ print(f"The factorial of {number} is {factorial(number)}")
 # Example usage
 n_terms = 10
 print(f"Fibonacci sequence with {n_terms} terms: {fibonacci(n_terms)}")
-"""
-    
-    # HTML boilerplate
-    elif "html" in request_lower and ("boilerplate" in request_lower or "template" in request_lower):
-        return "html", """<!DOCTYPE html>
+"""),
+    "html_template": ("html", """<!DOCTYPE html>
 <html lang="en">
 <head>
     <meta charset="UTF-8">
@@ -690,11 +810,8 @@ print(f"Fibonacci sequence with {n_terms} terms: {fibonacci(n_terms)}")
     </div>
 </body>
 </html>
-"""
-    
-    # SQL query to create a table and insert data
-    elif "sql" in request_lower and ("table" in request_lower or "database" in request_lower):
-        return "sql", """-- Create a users table
+"""),
+    "sql_table": ("sql", """-- Create a users table
 CREATE TABLE users (
     user_id INT PRIMARY KEY AUTO_INCREMENT,
     username VARCHAR(50) NOT NULL UNIQUE,
@@ -716,11 +833,8 @@ SELECT user_id, username, email, created_at
 FROM users
 WHERE is_active = TRUE
 ORDER BY created_at DESC;
-"""
-    
-    # Default response for other code requests
-    else:
-        return "python", """# Here's a simple Python example
+"""),
+    "python_greeting": ("python", """# Here's a simple Python example
 def greet(name):
     \"\"\"Return a greeting message.\"\"\"
     return f"Hello, {name}! Welcome to programming."
@@ -729,32 +843,57 @@ def greet(name):
 user_name = "World"
 message = greet(user_name)
 print(message)
-"""
+"""),
+}
+
+# generate_simple_code rules, checked in order against the lowercased request:
+# (words that must all appear, words of which at least one must appear, snippet)
+_SNIPPET_RULES = [
+    (("fetch", "api"), (), "javascript_fetch"),
+    (("prime",), ("check", "number"), "python_prime"),
+    (("factorial",), (), "python_factorial"),
+    (("fibonacci",), (), "python_fibonacci"),
+    (("html",), ("boilerplate", "template"), "html_template"),
+    (("sql",), ("table", "database"), "sql_table"),
+]
+
+def generate_simple_code(request: str) -> Tuple[str, str]:
+    """Generate simple code snippets based on the request."""
+    request_lower = request.lower()
+    
+    for required, any_of, snippet in _SNIPPET_RULES:
+        if all(word in request_lower for word in required) and \
+           (not any_of or any(word in request_lower for word in any_of)):
+            return _SNIPPETS[snippet]
+    
+    # Default response for other code requests
+    return _SNIPPETS["python_greeting"]
 
 def analyze_html_errors(html_code: str) -> Dict[str, Any]:
     """Detect common HTML errors."""
     errors = []
     
-    # Check for mismatched tags
-    opening_tags = re.findall(r'<(\w+)[^>]*>', html_code)
-    closing_tags = re.findall(r'</(\w+)>', html_code)
-    
-    # Simple check for matching opening and closing tags
-    if len(opening_tags) != len(closing_tags):
-        errors.append("Mismatched number of opening and closing tags")
-    
-    # Check for specific mismatches
-    for i, tag in enumerate(closing_tags):
-        if i < len(opening_tags) and tag != opening_tags[-(i+1)]:
-            errors.append(f"Tag mismatch: Opening <{opening_tags[-(i+1)]}>  doesn't match closing </{tag}>")
+    # Walk the tags once, matching each closing tag against a stack of open ones
+    open_tags = []
+    for is_closing, tag in _HTML_TAG_RE.findall(html_code):
+        tag = tag.lower()
+        if tag in _HTML_VOID_TAGS:
+            continue
+        
+        if not is_closing:
+            open_tags.append(tag)
+        elif not open_tags:
+            errors.append(f"Unexpected closing tag: </{tag}>")
+        else:
+            opening = open_tags.pop()
+            if opening != tag:
+                errors.append(f"Tag mismatch: Opening <{opening}> doesn't match closing </{tag}>")
     
-    # Check for unclosed tags
-    for tag in opening_tags:
-        if tag not in closing_tags and tag not in ['img', 'br', 'hr', 'input', 'meta', 'link']:
-            errors.append(f"Unclosed tag: <{tag}>")
+    # Anything left open was never closed
+    errors.extend(f"Unclosed tag: <{tag}>" for tag in open_tags)
     
     # Check for invalid attributes
-    if re.search(r'<\w+\s+[^>]*=\s*[^\'"][^\s>]*[^\'"][^>]*>', html_code):
+    if _HTML_UNQUOTED_ATTR_RE.search(html_code):
         errors.append("Possible invalid attribute format (missing quotes)")
     
     return {
@@ -0,0 +1,31 @@
+import os
+import sys
+
+sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
+from code_support import analyze_html_errors
+
+def test_valid_html():
+    result = analyze_html_errors('<div class="box"><p>Hello<br>world</p><img src="a.png"></div>')
+    assert result == {"has_errors": False, "errors": []}
+
+def test_tag_mismatch():
+    result = analyze_html_errors("<div><p>Hello</div></p>")
+    assert result["has_errors"]
+    assert result["errors"][0] == "Tag mismatch: Opening <p> doesn't match closing </div>"
+
+def test_unclosed_and_unexpected_tags():
+    assert analyze_html_errors("<ul><li>One</li>")["errors"] == ["Unclosed tag: <ul>"]
+    assert analyze_html_errors("<b>Bold</b></i>")["errors"] == ["Unexpected closing tag: </i>"]
+
+def test_tags_are_case_insensitive():
+    assert not analyze_html_errors("<DIV><Span>Hi</span></div>")["has_errors"]
+
+def test_unquoted_attribute():
+    result = analyze_html_errors("<div class=box>Hi</div>")
+    assert result["errors"] == ["Possible invalid attribute format (missing quotes)"]
+
+if __name__ == "__main__":
+    for test in (test_valid_html, test_tag_mismatch, test_unclosed_and_unexpected_tags,
+                 test_tags_are_case_insensitive, test_unquoted_attribute):
+        test()
+        print(f"{test.__name__}: passed")
@@ -1,6 +1,14 @@
 from duckduckgo_search import DDGS
-from typing import Dict, List, Any
+from itertools import islice
+from typing import Dict, List, Any, Tuple
 import re
+import threading
+import time
+
+# Words that suggest the query refers back to the conversation
+_CONTEXT_REFERENCE_RE = re.compile(
+    r"\b(?:it|that|this|they|those|them|he|she|steps|instructions)\b", re.IGNORECASE
+)
 
 def is_general_knowledge_question(question: str) -> bool:
     """Determine if a question is likely a general knowledge question."""
@@ -21,6 +29,46 @@ def is_general_knowledge_question(question: str) -> bool:
     
     return False
 
+# Web results, keyed by normalized query: query -> (timestamp, results)
+# Questions are answered on threadpool threads, so access goes through the lock
+_search_cache: Dict[str, Tuple[float, List[Dict[str, str]]]] = {}
+_search_cache_lock = threading.Lock()
+_SEARCH_CACHE_TTL = 600  # 10 minutes
+_SEARCH_CACHE_SIZE = 1024
+_MAX_RESULTS = 5
+
+# One client per thread, so searches reuse an HTTP session without
+# sharing it between concurrent requests
+_local = threading.local()
+
+def _get_ddgs() -> DDGS:
+    """Return this thread's DuckDuckGo search client."""
+    ddgs = getattr(_local, "ddgs", None)
+    if ddgs is None:
+        ddgs = _local.ddgs = DDGS()
+    return ddgs
+
+def _ddg_fetch(query: str) -> List[Dict[str, str]]:
+    """Fetch DuckDuckGo results for a query, reusing recent results for the same query."""
+    key = " ".join(query.lower().split())
+    with _search_cache_lock:
+        cached = _search_cache.get(key)
+    if cached and time.time() - cached[0] < _SEARCH_CACHE_TTL:
+        return cached[1]
+    
+    # Stop consuming results as soon as we have enough
+    results = list(islice(_get_ddgs().text(query, max_results=_MAX_RESULTS), _MAX_RESULTS))
+    
+    # Only cache real results; drop the oldest entry when full
+    if results:
+        with _search_cache_lock:
+            _search_cache.pop(key, None)
+            if len(_search_cache) >= _SEARCH_CACHE_SIZE:
+                del _search_cache[next(iter(_search_cache))]
+            _search_cache[key] = (time.time(), results)
+    
+    return results
+
 def search_web(query: str, conversation_history=None) -> Dict[str, Any]:
     """
     Search the web for answers to general knowledge questions.
@@ -41,7 +89,7 @@ def search_web(query: str, conversation_history=None) -> Dict[str, Any]:
         recent_user_messages = [msg for msg in conversation_history[-4:] if msg.get("role") == "user"]
         
         # Check if the query could be referring to previous conversation
-        if any(word in query.lower() for word in ["it", "that", "this", "they", "those", "them", "he", "she", "steps", "instructions"]):
+        if _CONTEXT_REFERENCE_RE.search(query):
             # Create context from recent messages - but keep it brief!
             if recent_user_messages:
                 # Just use the most recent user query, not the entire conversation
@@ -54,11 +102,10 @@ def search_web(query: str, conversation_history=None) -> Dict[str, Any]:
     
     try:
         print(f"Searching web for: '{enhanced_query}'")
-        with DDGS() as ddgs:
-            # Limit query length to avoid API issues
-            if len(enhanced_query) > 200:
-                enhanced_query = enhanced_query[:200]
-            results = list(ddgs.text(enhanced_query, max_results=5))
+        # Limit query length to avoid API issues
+        if len(enhanced_query) > 200:
+            enhanced_query = enhanced_query[:200]
+        results = _ddg_fetch(enhanced_query)
             
         if not results:
             return {
@@ -68,10 +115,11 @@ def search_web(query: str, conversation_history=None) -> Dict[str, Any]:
                 "titles": []
             }
             
-        # Extract snippets and links
-        snippets = [result.get("body", "") for result in results]
-        links = [result.get("href", "") for result in results]
-        titles = [result.get("title", "") for result in results]
+        # Extract snippets, links and titles in one pass
+        snippets, links, titles = map(list, zip(*(
+            (result.get("body", ""), result.get("href", ""), result.get("title", ""))
+            for result in results
+        )))
         
         # Prepare the answer - include specific steps when requested
         if "how" in query.lower() or "steps" in query.lower() or "instructions" in query.lower():
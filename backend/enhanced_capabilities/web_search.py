@@ -1,6 +1,10 @@
+import re
 from typing import Dict, Any
 from duckduckgo_search import DDGS
 
+# Pronouns that suggest the query refers back to the conversation
+_PRONOUN_RE = re.compile(r"\b(?:it|that|this|they|those|them|he|she)\b", re.IGNORECASE)
+
 # Update the search_web function to utilize conversation history
 def search_web(query: str, conversation_history=None) -> Dict[str, Any]:
     """
@@ -20,9 +24,9 @@ def search_web(query: str, conversation_history=None) -> Dict[str, Any]:
         recent_messages = conversation_history[-3:]  # Last 3 messages
         
         # Check if the query could be referring to previous conversation
-        if any(word in query.lower() for word in ["it", "that", "this", "they", "those", "them", "he", "she"]):
+        if _PRONOUN_RE.search(query):
             # Create context from recent messages
-            context = " ".join([msg["content"] for msg in recent_messages])
+            context = " ".join(msg["content"] for msg in recent_messages)
             enhanced_query = f"{context} {query}"
     
     try:
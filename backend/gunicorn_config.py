@@ -1,8 +1,15 @@
 import multiprocessing
+import os
 
 # Gunicorn configuration
-bind = "0.0.0.0:$PORT"
-workers = multiprocessing.cpu_count() * 2 + 1
+# Gunicorn doesn't expand shell variables in its config, so read PORT here
+port = os.environ.get("PORT", "8000")
+bind = f"0.0.0.0:{port}"
+
+# Every worker is a separate process holding its own copy of the ML models,
+# so (workers x model memory) has to fit in RAM. Keep the default low.
+# Override with WEB_CONCURRENCY.
+workers = int(os.environ.get("WEB_CONCURRENCY", max(2, multiprocessing.cpu_count() // 2)))
 worker_class = 'uvicorn.workers.UvicornWorker'
 timeout = 120
 keepalive = 5
\ No newline at end of file
@@ -3,6 +3,7 @@ import json
 import random
 import uvicorn
 from fastapi import FastAPI, UploadFile, File, Form, HTTPException, Body, Request, BackgroundTasks
+from fastapi.concurrency import run_in_threadpool
 from fastapi.middleware.cors import CORSMiddleware
 from pydantic import BaseModel
 from typing import List, Optional, Dict, Any
@@ -168,8 +169,10 @@ async def process_chat(request: ChatRequest):
             try:
                 print(f"Trying enhanced capabilities for: '{user_message}'")
                 
-                # Use the enhanced capabilities router
-                result = handle_question(
+                # Use the enhanced capabilities router. It blocks on web searches and
+                # model calls, so run it in the threadpool to keep the event loop free.
+                result = await run_in_threadpool(
+                    handle_question,
                     user_message,
                     search_school_docs_func=lambda q: retrieval_engine.retrieve_context(q),
                     conversation_history=conversation_history
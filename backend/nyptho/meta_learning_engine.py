@@ -1,8 +1,23 @@
 
 from typing import List, Dict, Any, Optional, Tuple
-import numpy as np
-import random
-import time
+from collections import Counter
+from functools import lru_cache
+from operator import itemgetter
+import re
+
+# Common long words that don't indicate a reference to the context
+_CONTEXT_STOP_WORDS = frozenset(["there", "their", "would", "should", "could"])
+_KEY_TERM_RE = re.compile(r"\w{6,}")  # meaningful words of sufficient length
+
+@lru_cache(maxsize=256)
+def _context_key_terms(context_text: str) -> frozenset:
+    """Key terms of a context text: meaningful words of sufficient length, casefolded"""
+    terms = (match.group().casefold() for match in _KEY_TERM_RE.finditer(context_text))
+    return frozenset(term for term in terms if term not in _CONTEXT_STOP_WORDS)
+
+# Response openings/closings recognized by _identify_response_patterns
+_GREETING_OPENINGS = ("hi ", "hello ", "greetings", "hey ")
+_SUPPORTIVE_CLOSINGS = ("help!", "help.", "know.", "questions?")
 
 class MetaLearningEngine:
     """
@@ -58,28 +73,19 @@ class MetaLearningEngine:
         features = self._extract_learning_features(query, response, context)
         
         # Update model performance tracking
-        if model_id not in self.model_performance:
-            self.model_performance[model_id] = {
-                "observations": 0,
-                "avg_response_length": 0,
-                "response_patterns": {},
-                "context_usage": 0
-            }
+        perf = self.model_performance.get(model_id)
+        if perf is None:
+            perf = self.model_performance[model_id] = self._new_perf()
         
-        perf = self.model_performance[model_id]
         perf["observations"] += 1
-        perf["avg_response_length"] = ((perf["avg_response_length"] * (perf["observations"] - 1)) + 
-                                     len(response)) / perf["observations"]
+        perf["avg_response_length"] += (len(response) - perf["avg_response_length"]) / perf["observations"]
         
         # Track context usage
         if context and features["context_references"] > 0:
             perf["context_usage"] += 1
         
         # Track response patterns
-        for pattern in features["identified_patterns"]:
-            if pattern not in perf["response_patterns"]:
-                perf["response_patterns"][pattern] = 0
-            perf["response_patterns"][pattern] += 1
+        perf["response_patterns"].update(features["identified_patterns"])
         
         # Update overall observation count
         self.observation_count += 1
@@ -108,51 +114,55 @@ class MetaLearningEngine:
         if not valid_models:
             return {"error": "No valid models to compare"}
         
-        # Create comparison metrics
+        # Create comparison metrics, scoring each model for the overall ranking
+        # based on observations and pattern diversity
+        rankings = []
         for model_id in valid_models:
             perf = self.model_performance[model_id]
+            context_usage_rate = perf["context_usage"] / max(1, perf["observations"])
             
             results["model_comparisons"][model_id] = {
                 "observations": perf["observations"],
                 "avg_response_length": perf["avg_response_length"],
-                "context_usage_rate": perf["context_usage"] / max(1, perf["observations"]),
-                "top_patterns": sorted(perf["response_patterns"].items(), 
-                                      key=lambda x: x[1], reverse=True)[:3],
+                "context_usage_rate": context_usage_rate,
+                "top_patterns": perf["response_patterns"].most_common(3),
                 "strengths": self._identify_model_strengths(model_id)
             }
-        
-        # Create overall ranking based on observations and pattern diversity
-        rankings = []
-        for model_id in valid_models:
-            perf = self.model_performance[model_id]
+            
             score = (
                 perf["observations"] * 0.5 +
                 len(perf["response_patterns"]) * 0.3 +
-                (perf["context_usage"] / max(1, perf["observations"])) * 10
+                context_usage_rate * 10
             )
             rankings.append((model_id, score))
         
-        rankings.sort(key=lambda x: x[1], reverse=True)
+        rankings.sort(key=itemgetter(1), reverse=True)
         results["overall_ranking"] = rankings
         
-        # Identify unique strengths
+        # Identify unique strengths (a strength is unique if only one model has it)
+        strength_counts = Counter(
+            strength
+            for model_id in valid_models
+            for strength in results["model_comparisons"][model_id]["strengths"]
+        )
         for model_id in valid_models:
-            strengths = results["model_comparisons"][model_id]["strengths"]
-            for strength in strengths:
-                is_unique = True
-                for other_id in valid_models:
-                    if other_id != model_id:
-                        if strength in results["model_comparisons"][other_id]["strengths"]:
-                            is_unique = False
-                            break
-                
-                if is_unique:
-                    if model_id not in results["unique_strengths"]:
-                        results["unique_strengths"][model_id] = []
-                    results["unique_strengths"][model_id].append(strength)
+            unique = [strength for strength in results["model_comparisons"][model_id]["strengths"]
+                      if strength_counts[strength] == 1]
+            if unique:
+                results["unique_strengths"][model_id] = unique
         
         return results
     
+    @staticmethod
+    def _new_perf() -> Dict[str, Any]:
+        """Create the performance record for a newly observed model"""
+        return {
+            "observations": 0,
+            "avg_response_length": 0.0,
+            "response_patterns": Counter(),
+            "context_usage": 0
+        }
+    
     def get_learning_status(self) -> Dict[str, Any]:
         """Get the current state of the learning engine"""
         return {
@@ -171,23 +181,26 @@ class MetaLearningEngine:
         """
         Extract learning features from an observed interaction
         """
+        paragraph_breaks = response.count('\n\n')
         features = {
             "response_length": len(response),
             "sentence_count": response.count('.') + response.count('!') + response.count('?'),
-            "paragraph_structure": response.count('\n\n'),
-            "identified_patterns": self._identify_response_patterns(response),
+            "paragraph_structure": paragraph_breaks,
+            "identified_patterns": self._identify_response_patterns(response, paragraph_breaks),
             "context_references": self._count_context_references(response, context)
         }
         return features
     
-    def _identify_response_patterns(self, response: str) -> List[str]:
+    def _identify_response_patterns(self, response: str, paragraph_breaks: Optional[int] = None) -> List[str]:
         """Identify patterns in the response structure"""
+        if paragraph_breaks is None:
+            paragraph_breaks = response.count('\n\n')
         patterns = []
         
         # Check for opening patterns
         if response.startswith("I "):
             patterns.append("first_person_opening")
-        elif any(response.lower().startswith(greeting) for greeting in ["hi ", "hello ", "greetings", "hey "]):
+        elif response[:9].lower().startswith(_GREETING_OPENINGS):  # only lower what we compare
             patterns.append("greeting_opening")
         elif response.startswith("The "):
             patterns.append("factual_opening")
@@ -197,15 +210,15 @@ class MetaLearningEngine:
             patterns.append("list_format")
         if "```" in response:
             patterns.append("code_block")
-        if "**" in response or "*" in response:
+        if "*" in response:  # also covers "**"
             patterns.append("emphasis_formatting")
-        if response.count('\n\n') > 2:
+        if paragraph_breaks > 2:
             patterns.append("multi_paragraph")
         
         # Check for closing patterns
         if "?" in response[-5:]:
             patterns.append("question_closing")
-        elif any(response.lower().endswith(closing) for closing in ["help!", "help.", "know.", "questions?"]):
+        elif response[-10:].lower().endswith(_SUPPORTIVE_CLOSINGS):
             patterns.append("supportive_closing")
             
         return patterns
@@ -217,26 +230,20 @@ class MetaLearningEngine:
         if not context:
             return 0
             
-        reference_count = 0
-        
-        # Look for context terms in the response
+        # Extract potential key terms (simplified); the same context texts recur
+        # across observations, so their term sets are memoized
+        key_terms = set()
         for ctx_item in context:
             if 'text' in ctx_item:
-                # Get key terms from context
-                context_text = ctx_item['text']
-                key_terms = []
-                
-                # Extract potential key terms (simplified)
-                words = context_text.split()
-                for word in words:
-                    # Only consider meaningful words of sufficient length
-                    if len(word) > 5 and not word.lower() in ["there", "their", "would", "should", "could"]:
-                        key_terms.append(word.lower())
-                
-                # Count matches in response
-                for term in key_terms:
-                    if term in response.lower():
-                        reference_count += 1
+                key_terms |= _context_key_terms(ctx_item['text'])
+        
+        if not key_terms:
+            return 0
+        
+        # Count key terms that appear in the response (only words long enough
+        # to be key terms can match, so shorter ones are never hashed)
+        response_words = set(_KEY_TERM_RE.findall(response.casefold()))
+        reference_count = len(key_terms & response_words)
         
         return min(10, reference_count)  # Cap at 10 to avoid skewing
     
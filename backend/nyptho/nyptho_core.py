@@ -1,11 +1,92 @@
 
 import json
 import time
+import atexit
 import random
 import os
-from typing import List, Dict, Any, Optional
+import sys
+import queue
+import threading
+import heapq
+import itertools
+from collections import deque
+from operator import itemgetter
+from functools import lru_cache, partial
+from typing import List, Dict, Any, Optional, Tuple, Callable
 from pathlib import Path
-import numpy as np
+
+# Common words ignored when extracting keywords
+_STOP_WORDS = frozenset({'a', 'an', 'the', 'and', 'or', 'but', 'is', 'are', 'was', 'were', 'to', 'of', 'in', 'for', 'with', 'by', 'at', 'on'})
+
+@lru_cache(maxsize=4096)
+def _keywords(text: str) -> Tuple[str, ...]:
+    """Extract key terms from text (memoized; the same query is processed several times)"""
+    # Keywords are pattern_database keys; interned strings make lookups pointer compares
+    return tuple(sys.intern(w) for w in text.lower().split() if w not in _STOP_WORDS and len(w) > 2)
+
+# Words used by NypthoCore._analyze_sentiment
+_POSITIVE_WORDS = frozenset({"good", "great", "awesome", "excellent", "fantastic", "wonderful", "amazing", "happy", "love", "like"})
+_NEGATIVE_WORDS = frozenset({"bad", "terrible", "awful", "horrible", "poor", "sad", "hate", "dislike", "worst", "failure"})
+
+_GREETINGS = ("hello", "hi", "greetings", "hey")
+
+# Question words and their placeholders in generalized queries
+_QUESTION_WORD_TOKENS = {word: f"<{word}>" for word in ("who", "what", "when", "where", "why", "how")}
+
+# Patterns rank by (confidence, count)
+_PATTERN_RANK = itemgetter("confidence", "count")
+
+_MATCH_CACHE_SIZE = 512
+
+# Keys of the structure dict built by NypthoCore._analyze_structure
+_STRUCTURE_KEYS = ("has_greeting", "has_question", "paragraphs", "sentences")
+
+def _similarity_keys(structure: Dict[str, Any]) -> Tuple[Tuple, ...]:
+    """
+    Structure signatures with one attribute wildcarded (None).
+    
+    Two templates are similar (> 0.7 in _template_similarity) when at least
+    3 of their 4 structure attributes match, i.e. when they share one of these keys.
+    """
+    return _wildcard_signatures(tuple(structure[key] for key in _STRUCTURE_KEYS))
+
+@lru_cache(maxsize=4096)
+def _wildcard_signatures(signature: Tuple) -> Tuple[Tuple, ...]:
+    """Memoized by signature: responses (and loaded patterns) share a small set of structures"""
+    return tuple(signature[:i] + (None,) + signature[i + 1:] for i in range(len(signature)))
+
+# Phrases used when generating responses
+_VARIATIONS = (
+    "I think ", 
+    "In my view, ", 
+    "Based on my analysis, ",
+    "From what I understand, ",
+    "It appears that "
+)
+
+_FRIENDLY_OPENINGS = (
+    "Happy to help! ",
+    "Great question! ",
+    "I'd be delighted to assist. ",
+    "Thanks for asking. "
+)
+
+_FRIENDLY_CLOSINGS = (
+    "\n\nHope that helps!",
+    "\n\nLet me know if you need anything else.",
+    "\n\nIs there anything else you'd like to know?"
+)
+
+# Texts starting/ending with these already have an opening/closing
+_OPENING_PREFIXES = ("Hi", "Hello", "Hey", "Thanks", "Thank", "Great", "Happy")
+_FRIENDLY_CLOSING_ENDINGS = tuple(closing.strip() for closing in _FRIENDLY_CLOSINGS)
+
+_GENERIC_TEMPLATES = (
+    "I'm still learning about topics like this. Could you tell me more about what you're looking for regarding {topic}?",
+    "That's an interesting question about {topic}. I'm gathering more information on this subject.",
+    "I don't have enough information about {topic} yet, but I'm continuously learning.",
+    "I'm not fully trained on {topic} yet, but I'm interested in learning more about your question."
+)
 
 class NypthoCore:
     """
@@ -15,6 +96,8 @@ class NypthoCore:
     - Can generate responses emulating learned patterns
     """
     
+    SAVE_INTERVAL = 50
+    
     def __init__(self, 
                  model_dir: str = "./nyptho_models",
                  learning_rate: float = 0.01,
@@ -25,8 +108,21 @@ class NypthoCore:
         
         self.learning_rate = learning_rate
         self.memory_size = memory_size
-        self.interaction_memory = []
+        self.interaction_memory = deque(maxlen=memory_size)
+        self._rng = random.Random()
+        self._unsaved_observations = 0
+        
+        # Observations are learned from by a background worker; the lock
+        # guards the pattern database between it and response generation
+        self._lock = threading.RLock()
+        self._pending = queue.Queue()
+        self._worker = None
         self.pattern_database = {}
+        # keyword -> similarity key -> position of the first pattern with that key
+        self._similarity_index = {}
+        # (query keywords, limit) -> best matching patterns; entries are dropped
+        # when the patterns of one of their keywords change
+        self._match_cache = {}
         self.response_templates = {}
         self.personality_traits = {
             "helpfulness": 0.8,
@@ -38,6 +134,7 @@ class NypthoCore:
         
         # Load any existing models
         self._load_models()
+        self._build_similarity_index()
         print("Nyptho Core System initialized")
     
     def observe_interaction(self, 
@@ -48,34 +145,65 @@ class NypthoCore:
         """
         Record and learn from an AI interaction
         
+        Learning is eventually consistent: the interaction is queued for a
+        background worker, so its "features" and the patterns learned from it
+        only appear once the worker catches up. Call flush() before reading
+        them. Queued interactions are learned from and saved at exit.
+        
         Args:
             query: User query that generated the response
             response: The AI's response to learn from
             source_model: Identifier of the source AI model
             metadata: Additional information about the interaction
         """
-        # Create interaction record
+        # Create interaction record (its "features" are extracted by the learner)
         interaction = {
             "query": query,
             "response": response,
             "source_model": source_model,
             "metadata": metadata or {},
-            "timestamp": time.time(),
-            "features": self._extract_features(query, response)
+            "timestamp": time.time()
         }
         
-        # Add to memory (with size limit)
+        # Add to memory (the deque drops the oldest interaction when full)
         self.interaction_memory.append(interaction)
-        if len(self.interaction_memory) > self.memory_size:
-            self.interaction_memory.pop(0)
-        
-        # Update pattern database
-        self._update_patterns(interaction)
         
-        # Periodic saving of learned models
-        if len(self.interaction_memory) % 50 == 0:
+        # Learn from it in the background so observing stays cheap
+        if self._worker is None:
+            self._worker = threading.Thread(target=self._learn_pending, name="nyptho-learner", daemon=True)
+            self._worker.start()
+            atexit.register(self._finish_learning)
+        self._pending.put(interaction)
+    
+    def flush(self) -> None:
+        """Wait until all observed interactions have been learned from"""
+        self._pending.join()
+    
+    def _finish_learning(self) -> None:
+        """Learn from the interactions still queued at exit and save the result"""
+        self.flush()
+        if self._unsaved_observations:
             self._save_models()
     
+    def _learn_pending(self) -> None:
+        """Background worker: update patterns from queued interactions"""
+        while True:
+            interaction = self._pending.get()
+            try:
+                interaction["features"] = self._extract_features(interaction["query"], interaction["response"])
+                with self._lock:
+                    # Update pattern database
+                    self._update_patterns(interaction)
+                
+                # Periodic saving of learned models (every SAVE_INTERVAL observations)
+                self._unsaved_observations += 1
+                if self._unsaved_observations >= self.SAVE_INTERVAL:
+                    self._save_models()
+            except Exception as e:
+                print(f"Error learning from interaction: {e}")
+            finally:
+                self._pending.task_done()
+    
     def generate_response(self, 
                          query: str, 
                          context: Optional[List[Dict[str, Any]]] = None,
@@ -98,7 +226,8 @@ class NypthoCore:
         active_persona = persona or self.personality_traits
         
         # Find matching patterns
-        matching_patterns = self._find_matching_patterns(query)
+        with self._lock:
+            matching_patterns = self._find_matching_patterns(query)
         
         if not matching_patterns:
             # Fallback to generic response
@@ -107,24 +236,22 @@ class NypthoCore:
         # Generate response based on patterns and persona
         responses = []
         weights = []
+        query_lower = query.lower()
+        persona_steps = self._persona_steps(active_persona, context)
         
-        for pattern in matching_patterns[:5]:  # Use top 5 matches
+        for pattern in matching_patterns:  # Top 5 matches
             template = pattern["template"]
             confidence = pattern["confidence"]
             
             # Generate response from template
-            response = self._apply_template(template, query, context, active_persona)
+            response = self._apply_template(template, query, context, active_persona, query_lower, persona_steps)
             responses.append(response)
             weights.append(confidence)
         
-        # Normalize weights
-        total_weight = sum(weights)
-        if total_weight > 0:
-            weights = [w/total_weight for w in weights]
-            
-            # Weighted selection of response
-            selected_idx = np.random.choice(len(responses), p=weights)
-            return responses[selected_idx]
+        # Weighted selection of response (choices takes unnormalized
+        # weights and is much cheaper than numpy for a handful of items)
+        if sum(weights) > 0:
+            return self._rng.choices(responses, weights=weights)[0]
         
         return self._generate_generic_response(query, active_persona)
     
@@ -147,31 +274,26 @@ class NypthoCore:
     
     def _extract_keywords(self, text: str) -> List[str]:
         """Extract key terms from text"""
-        # Simple keyword extraction
-        words = text.lower().split()
-        # Remove common stop words
-        stop_words = {'a', 'an', 'the', 'and', 'or', 'but', 'is', 'are', 'was', 'were', 'to', 'of', 'in', 'for', 'with', 'by', 'at', 'on'}
-        keywords = [w for w in words if w not in stop_words and len(w) > 2]
-        return keywords
+        # Simple keyword extraction, with common stop words removed
+        return list(_keywords(text))
     
     def _analyze_structure(self, text: str) -> Dict[str, Any]:
         """Analyze the structure of a response"""
+        text_lower = text.lower()
         structure = {
-            "has_greeting": any(greeting in text.lower() for greeting in ["hello", "hi", "greetings", "hey"]),
+            "has_greeting": any(greeting in text_lower for greeting in _GREETINGS),
             "has_question": "?" in text,
-            "paragraphs": len([p for p in text.split("\n\n") if p.strip()]),
+            "paragraphs": sum(1 for p in text.split("\n\n") if p and not p.isspace()),
             "sentences": text.count(".") + text.count("!") + text.count("?"),
         }
         return structure
     
     def _analyze_sentiment(self, text: str) -> str:
         """Simple sentiment analysis"""
-        positive_words = {"good", "great", "awesome", "excellent", "fantastic", "wonderful", "amazing", "happy", "love", "like"}
-        negative_words = {"bad", "terrible", "awful", "horrible", "poor", "sad", "hate", "dislike", "worst", "failure"}
-        
-        words = set(text.lower().split())
-        pos_count = len(positive_words.intersection(words))
-        neg_count = len(negative_words.intersection(words))
+        # Intersect straight from the word list; no set of all words is needed
+        words = text.lower().split()
+        pos_count = len(_POSITIVE_WORDS.intersection(words))
+        neg_count = len(_NEGATIVE_WORDS.intersection(words))
         
         if pos_count > neg_count:
             return "positive"
@@ -188,41 +310,60 @@ class NypthoCore:
         # Extract keywords for pattern matching
         keywords = features["query_keywords"]
         
+        if not keywords:
+            return
+        
+        # Only cached matches that draw on these keywords' patterns are stale
+        updated = set(keywords)
+        stale = [key for key in self._match_cache if not updated.isdisjoint(key[0])]
+        for key in stale:
+            del self._match_cache[key]
+        
+        # Response template, shared by the patterns of every keyword
+        template = self._create_template(query, response, features["response_structure"])
+        similarity_keys = _similarity_keys(template["structure"])
+        
         # Create pattern key from keywords
         for keyword in keywords:
-            if keyword not in self.pattern_database:
-                self.pattern_database[keyword] = []
-            
-            # Add response template
-            template = self._create_template(query, response)
-            
-            # Check if similar template exists
-            existing = False
-            for pattern in self.pattern_database[keyword]:
-                if self._template_similarity(pattern["template"], template) > 0.7:
-                    # Update existing pattern
-                    pattern["count"] += 1
-                    pattern["confidence"] = min(0.9, pattern["confidence"] + 0.05)
-                    existing = True
-                    break
+            patterns = self.pattern_database.setdefault(keyword, [])
+            index = self._similarity_index.setdefault(keyword, {})
             
-            if not existing:
+            # Check if similar template exists (the earliest one wins)
+            positions = [index[key] for key in similarity_keys if key in index]
+            if positions:
+                # Update existing pattern
+                pattern = patterns[min(positions)]
+                pattern["count"] += 1
+                pattern["confidence"] = min(0.9, pattern["confidence"] + 0.05)
+            else:
                 # Add new pattern
-                self.pattern_database[keyword].append({
+                patterns.append({
                     "template": template,
                     "source": interaction["source_model"],
                     "count": 1,
                     "confidence": 0.5,  # Initial confidence
                     "features": features
                 })
+                for key in similarity_keys:
+                    index.setdefault(key, len(patterns) - 1)
+    
+    def _build_similarity_index(self) -> None:
+        """Index the pattern database by structure for similar-template lookups"""
+        self._similarity_index = {}
+        for keyword, patterns in self.pattern_database.items():
+            index = self._similarity_index[keyword] = {}
+            for position, pattern in enumerate(patterns):
+                for key in _similarity_keys(pattern["template"]["structure"]):
+                    index.setdefault(key, position)
     
-    def _create_template(self, query: str, response: str) -> Dict[str, Any]:
-        """Create a response template from query-response pair"""
+    def _create_template(self, query: str, response: str,
+                         structure: Optional[Dict[str, Any]] = None) -> Dict[str, Any]:
+        """Create a response template from query-response pair (structure may be precomputed)"""
         template = {
             "base_text": response,
             "query_pattern": self._generalize_query(query),
             "placeholders": self._identify_placeholders(query, response),
-            "structure": self._analyze_structure(response)
+            "structure": structure if structure is not None else self._analyze_structure(response)
         }
         return template
     
@@ -230,18 +371,10 @@ class NypthoCore:
         """Create a generalized pattern from a query"""
         # Very simple generalization for now
         # In a real system, this would use NLP to identify entities and concepts
-        words = query.lower().split()
-        generalized = []
-        
-        for word in words:
-            if word in ["who", "what", "when", "where", "why", "how"]:
-                generalized.append(f"<{word}>")
-            elif word.isdigit():
-                generalized.append("<number>")
-            else:
-                generalized.append(word)
-        
-        return " ".join(generalized)
+        return " ".join([
+            _QUESTION_WORD_TOKENS.get(word) or ("<number>" if word.isdigit() else word)
+            for word in query.lower().split()
+        ])
     
     def _identify_placeholders(self, query: str, response: str) -> Dict[str, str]:
         """Identify potential placeholders in the response"""
@@ -249,9 +382,10 @@ class NypthoCore:
         # In a real system, this would identify query terms that appear in the response
         placeholders = {}
         query_terms = set(query.lower().split())
+        response_lower = response.lower()
         
         for term in query_terms:
-            if term in response.lower() and len(term) > 3:
+            if len(term) > 3 and term in response_lower:
                 placeholders[term] = f"<{term}>"
         
         return placeholders
@@ -263,69 +397,86 @@ class NypthoCore:
         structure2 = template2["structure"]
         
         # Count matching attributes
-        matches = 0
-        total = 0
+        shared = structure1.keys() & structure2.keys()
+        matches = sum(structure1[key] == structure2[key] for key in shared)
         
-        for key in structure1:
-            if key in structure2:
-                total += 1
-                if structure1[key] == structure2[key]:
-                    matches += 1
-        
-        return matches / max(1, total)
+        return matches / max(1, len(shared))
     
-    def _find_matching_patterns(self, query: str) -> List[Dict[str, Any]]:
-        """Find patterns that match a query"""
-        keywords = self._extract_keywords(query)
-        matches = []
-        
-        # Gather all potential matches from keywords
-        for keyword in keywords:
-            if keyword in self.pattern_database:
-                matches.extend(self.pattern_database[keyword])
-        
-        # Sort by confidence and count
-        matches.sort(key=lambda x: (x["confidence"], x["count"]), reverse=True)
+    def _find_matching_patterns(self, query: str, limit: int = 5) -> List[Dict[str, Any]]:
+        """Find the best patterns (by confidence and count) that match a query"""
+        # Queries that differ only in case, stop words or repeated words
+        # share their keywords, and so their matches
+        keywords = tuple(dict.fromkeys(_keywords(query)))
+        cache_key = (keywords, limit)
+        matches = self._match_cache.get(cache_key)
+        if matches is not None:
+            return matches
+        
+        # Gather all potential matches from the query's distinct keywords
+        candidates = itertools.chain.from_iterable(
+            self.pattern_database[keyword]
+            for keyword in keywords
+            if keyword in self.pattern_database
+        )
+        
+        # Only the top few are used, so avoid sorting every candidate
+        matches = heapq.nlargest(limit, candidates, key=_PATTERN_RANK)
+        
+        if len(self._match_cache) >= _MATCH_CACHE_SIZE:
+            del self._match_cache[next(iter(self._match_cache))]
+        self._match_cache[cache_key] = matches
         return matches
     
-    def _apply_template(self, template: Dict[str, Any], query: str, context: Optional[List], persona: Dict[str, float]) -> str:
-        """Apply a template to generate a response"""
-        base_text = template["base_text"]
+    def _apply_template(self, template: Dict[str, Any], query: str, context: Optional[List], persona: Dict[str, float],
+                        query_lower: Optional[str] = None,
+                        persona_steps: Optional[List[Callable[[str], str]]] = None) -> str:
+        """
+        Apply a template to generate a response
         
-        # Apply personality traits
-        if persona["creativity"] > 0.7:
-            # Add some variation
-            base_text = self._add_variation(base_text)
+        query_lower and persona_steps (from _persona_steps) may be passed in
+        when applying several templates for the same query.
+        """
+        base_text = template["base_text"]
+        if query_lower is None:
+            query_lower = query.lower()
+        if persona_steps is None:
+            persona_steps = self._persona_steps(persona, context)
         
         # Replace placeholders
         for original, placeholder in template["placeholders"].items():
-            if original in query.lower():
+            if original in query_lower:
                 base_text = base_text.replace(placeholder, original)
         
+        # Apply personality traits
+        for step in persona_steps:
+            base_text = step(base_text)
+        
+        return base_text
+    
+    def _persona_steps(self, persona: Dict[str, float], context: Optional[List]) -> List[Callable[[str], str]]:
+        """Resolve a persona into the text transformations to apply, in order"""
+        steps = []
+        
+        # Add some variation for creativity
+        if persona["creativity"] > 0.7:
+            steps.append(self._add_variation)
+        
         # Add precision details if needed
         if persona["precision"] > 0.8 and context:
-            base_text = self._add_details(base_text, context)
+            steps.append(partial(self._add_details, context=context))
         
         # Add friendliness markers if needed
         if persona["friendliness"] > 0.7:
-            base_text = self._add_friendliness(base_text)
+            steps.append(self._add_friendliness)
         
-        return base_text
+        return steps
     
     def _add_variation(self, text: str) -> str:
         """Add variation to a response for creativity"""
-        variations = [
-            "I think ", 
-            "In my view, ", 
-            "Based on my analysis, ",
-            "From what I understand, ",
-            "It appears that "
-        ]
-        
         sentences = text.split(". ")
         if len(sentences) > 1:
-            idx = random.randint(0, len(sentences)-1)
-            variation = random.choice(variations)
+            idx = self._rng.randint(0, len(sentences)-1)
+            variation = self._rng.choice(_VARIATIONS)
             sentences[idx] = variation + sentences[idx][0].lower() + sentences[idx][1:]
         
         return ". ".join(sentences)
@@ -344,43 +495,25 @@ class NypthoCore:
     
     def _add_friendliness(self, text: str) -> str:
         """Add friendliness markers"""
-        friendly_openings = [
-            "Happy to help! ",
-            "Great question! ",
-            "I'd be delighted to assist. ",
-            "Thanks for asking. "
-        ]
-        
-        friendly_closings = [
-            "\n\nHope that helps!",
-            "\n\nLet me know if you need anything else.",
-            "\n\nIs there anything else you'd like to know?"
-        ]
+        choice = self._rng.choice
         
         # Only add opening if there isn't one already
-        if not any(text.startswith(opening) for opening in ["Hi", "Hello", "Hey", "Thanks", "Thank", "Great", "Happy"]):
-            text = random.choice(friendly_openings) + text
+        if not text.startswith(_OPENING_PREFIXES):
+            text = choice(_FRIENDLY_OPENINGS) + text
         
         # Only add closing if there isn't one already
-        if not any(text.endswith(closing.strip()) for closing in friendly_closings):
-            text = text + random.choice(friendly_closings)
+        if not text.endswith(_FRIENDLY_CLOSING_ENDINGS):
+            text = text + choice(_FRIENDLY_CLOSINGS)
         
         return text
     
     def _generate_generic_response(self, query: str, persona: Dict[str, float]) -> str:
         """Generate a generic response when no pattern matches"""
-        generic_templates = [
-            "I'm still learning about topics like this. Could you tell me more about what you're looking for regarding {topic}?",
-            "That's an interesting question about {topic}. I'm gathering more information on this subject.",
-            "I don't have enough information about {topic} yet, but I'm continuously learning.",
-            "I'm not fully trained on {topic} yet, but I'm interested in learning more about your question."
-        ]
-        
         # Extract a topic from the query
-        keywords = self._extract_keywords(query)
+        keywords = _keywords(query)
         topic = keywords[0] if keywords else "this topic"
         
-        template = random.choice(generic_templates)
+        template = self._rng.choice(_GENERIC_TEMPLATES)
         response = template.format(topic=topic)
         
         # Apply personality
@@ -399,10 +532,19 @@ class NypthoCore:
                 "timestamp": time.time()
             }
             
+            # Compact output: the database only grows, and indenting it
+            # made every snapshot several times slower and larger.
+            # json.dumps (unlike json.dump) uses the C encoder; the snapshot
+            # is written in one go and swapped in atomically.
+            with self._lock:
+                data = json.dumps(model_data, separators=(",", ":"))
             model_path = self.model_dir / "nyptho_model.json"
-            with open(model_path, 'w') as f:
-                json.dump(model_data, f, indent=2)
-                
+            tmp_path = model_path.with_suffix(".json.tmp")
+            with open(tmp_path, 'w') as f:
+                f.write(data)
+            os.replace(tmp_path, model_path)
+            
+            self._unsaved_observations = 0
             print(f"Model saved to {model_path}")
             
         except Exception as e:
@@ -418,7 +560,10 @@ class NypthoCore:
                     model_data = json.load(f)
                     
                 if "pattern_database" in model_data:
-                    self.pattern_database = model_data["pattern_database"]
+                    self.pattern_database = {
+                        sys.intern(keyword): patterns
+                        for keyword, patterns in model_data["pattern_database"].items()
+                    }
                     
                 if "personality_traits" in model_data:
                     self.personality_traits = model_data["personality_traits"]
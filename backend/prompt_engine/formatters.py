@@ -11,14 +11,16 @@ class ContentFormatter:
         if not documents:
             return "No relevant context found."
             
-        formatted_context = "Here is relevant information from the ALU knowledge base:\n\n"
+        parts = ["Here is relevant information from the ALU knowledge base:\n\n"]
         
         for i, doc in enumerate(documents):
-            formatted_context += f"Document {i+1}: {doc.metadata.get('title', 'Untitled')}\n"
-            formatted_context += f"Source: {doc.metadata.get('source', 'Unknown')}\n"
-            formatted_context += f"Content: {doc.text}\n\n"
+            parts.append(
+                f"Document {i+1}: {doc.metadata.get('title', 'Untitled')}\n"
+                f"Source: {doc.metadata.get('source', 'Unknown')}\n"
+                f"Content: {doc.text}\n\n"
+            )
             
-        return formatted_context
+        return "".join(parts)
     
     @staticmethod
     def format_conversation_history(conversation_history: List[Dict[str, Any]]) -> str:
@@ -26,11 +28,11 @@ class ContentFormatter:
         if not conversation_history:
             return "No previous conversation."
             
-        formatted_history = "Previous messages:\n\n"
+        parts = ["Previous messages:\n\n"]
         
         for msg in conversation_history:
             role = msg.get("role", "unknown")
             content = msg.get("text", msg.get("content", ""))
-            formatted_history += f"{role.capitalize()}: {content}\n\n"
+            parts.append(f"{role.capitalize()}: {content}\n\n")
             
-        return formatted_history
+        return "".join(parts)
@@ -1,17 +1,73 @@
 import random
 import time
 import re
+import hashlib
+import threading
+from collections import OrderedDict
 from typing import List, Dict, Any, Optional
-import markdown
 
-from retrieval_engine import Document
+from retrieval_engine import Document, ALU_BRAIN_SOURCE_PREFIX
+
+# Patterns used to pick apart ALU Brain documents
+_LINK_RE = re.compile(r'- (.+?): (https?://\S+)')
+_LINK_LIST_START_RE = re.compile(r'\n\n- ')
+_TABLE_DATA_RE = re.compile(r"Table data:\n([\s\S]+)")
+_NUMBERED_STEPS_RE = re.compile(r"\n(\d+\..+(?:\n\d+\..+)*)")
+
+# Openers for general responses, in priority order, with the query keywords that trigger them
+_TOPIC_OPENERS = (
+    (("graduation",), "🎓 Congratulations on your journey toward graduation! "),
+    (("course", "class"), "📚 Ready to dive into some exciting learning? "),
+    (("campus",), "🏫 Our beautiful campuses are waiting for you! "),
+    (("scholarship", "financial"), "💰 Let's make your education more affordable! "),
+    (("deadline",), "⏰ Don't worry, I've got the important dates for you! "),
+    (("faculty", "professor"), "👨‍🏫 Our amazing faculty members are here to support you! "),
+    (("help", "confused"), "🤗 We've all been there! Let me help clear things up: "),
+    (("thank",), "😊 You're very welcome! Here's what you asked about: "),
+)
+_OPENER_TOPICS = {
+    keyword: topic
+    for topic, (keywords, _) in enumerate(_TOPIC_OPENERS)
+    for keyword in keywords
+}
+# Lookahead so overlapping keywords are all found in one pass
+_OPENER_KEYWORD_RE = re.compile(f"(?=({'|'.join(_OPENER_TOPICS)}))")
+_FRIENDLY_OPENERS = (
+    "✨ Great question! ",
+    "🔍 I found just what you're looking for! ",
+    "💡 Here's something helpful: ",
+    "🌟 I'm happy to share this with you: ",
+    "🚀 Let's explore this together: "
+)
+
+def _doc_score(doc: Document) -> float:
+    """Sort key ranking documents by score, treating a missing score as 0"""
+    return doc.score if doc.score is not None else 0
+
+def _brain_category(doc: Document) -> Optional[str]:
+    """
+    Return the ALU Brain category of a document, or None if it isn't ALU Brain
+    content. Chunks indexed before documents were tagged with is_brain and
+    brain_category only carry a "ALU Brain: <category>" source.
+    """
+    metadata = doc.metadata
+    if 'is_brain' in metadata and 'brain_category' in metadata:
+        return metadata['brain_category'] if metadata['is_brain'] else None
+    source = metadata.get('source', '')
+    if source.startswith(ALU_BRAIN_SOURCE_PREFIX):
+        return source[len(ALU_BRAIN_SOURCE_PREFIX):]
+    return None
 
 class ResponseGenerator:
     """Handles the generation of responses based on context and query"""
     
     def __init__(self):
-        self.response_cache = {}
+        # Least recently used entries first
+        self.response_cache: "OrderedDict[bytes, tuple]" = OrderedDict()
         self.cache_ttl = 300  # 5 minutes
+        self.cache_size = 100
+        # Requests are served from a threadpool; guards every response_cache access
+        self._cache_lock = threading.Lock()
         print("Enhanced ResponseGenerator initialized with caching and advanced formatting")
     
     def generate_response(self, 
@@ -23,35 +79,24 @@ class ResponseGenerator:
         with proper markdown formatting and knowledge integration
         """
         # Check cache for this query
-        cache_key = f"{query}:{role}:{len(context)}"
+        # Fixed-size fingerprint so long queries hash and compare cheaply
+        cache_key = hashlib.blake2b(f"{role}:{len(context)}:{query}".encode(), digest_size=16).digest()
         cached = self._get_from_cache(cache_key)
         if cached:
             return cached
         
-        # Start crafting response
-        response_parts = []
-        
-        # Add appropriate greeting
+        # Start crafting response with an appropriate greeting
         greeting = self._create_greeting(query, role)
-        if greeting:
-            response_parts.append(greeting)
         
-        # Process context from ALU Brain
-        brain_content = self._process_brain_content(query, context)
-        if brain_content:
-            response_parts.append(brain_content)
-        else:
-            # If no ALU Brain content, generate a response using other context
-            general_content = self._generate_general_response(query, context, role)
-            response_parts.append(general_content)
+        # Process context from ALU Brain; if there is none, generate a
+        # response using other context
+        body = self._process_brain_content(query, context) or self._generate_general_response(query, context, role)
         
         # Add appropriate closing
         closing = self._create_closing(query, role)
-        if closing:
-            response_parts.append(closing)
         
         # Format as markdown
-        full_response = "\n\n".join(response_parts)
+        full_response = "\n\n".join(part for part in (greeting, body, closing) if part)
         
         # Add to cache
         self._add_to_cache(cache_key, full_response)
@@ -61,160 +106,145 @@ class ResponseGenerator:
     def _process_brain_content(self, query: str, context: List[Document]) -> str:
         """Process ALU Brain content in the context to create a structured response"""
         # Identify ALU Brain documents
-        alu_brain_docs = [doc for doc in context if "ALU Brain" in doc.metadata.get('source', '')]
+        alu_brain_docs = [doc for doc in context if _brain_category(doc) is not None]
         
         if not alu_brain_docs:
             return ""
             
         # Choose the most relevant document(s)
-        # Sort by score if available
-        alu_brain_docs.sort(key=lambda x: x.score if x.score is not None else 0, reverse=True)
-        
-        # Add this after sorting the documents
-        if alu_brain_docs and hasattr(alu_brain_docs[0], 'score') and alu_brain_docs[0].score is not None:
-            top_score = alu_brain_docs[0].score
+        top_doc = max(alu_brain_docs, key=_doc_score)
+        if top_doc.score is not None:
+            top_score = top_doc.score
         else:
             top_score = 0.5  # Default score when none available
             
         min_acceptable_score = max(0.5, top_score * 0.7)  # At least 70% as relevant as top doc
+        
+        # Only documents above the threshold can be used, so sort just those
+        alu_brain_docs = sorted(
+            (doc for doc in alu_brain_docs if doc.score is not None and doc.score >= min_acceptable_score),
+            key=_doc_score,
+            reverse=True
+        )
 
         response_parts = []
         used_categories = set()
         doc_count = 0
         
         for doc in alu_brain_docs:
-            doc_score = getattr(doc, 'score', None)
-            if doc_score is None or doc_score < min_acceptable_score:
-                continue  # Skip documents that aren't relevant enough
-                
             # Limit to max 3 documents for conciseness
             if doc_count >= 3:
                 break
                 
-            source_category = doc.metadata.get('source', '').replace('ALU Brain: ', '')
+            source_category = _brain_category(doc)
             
             # Skip if we already used this category
             if source_category in used_categories:
                 continue
                 
             used_categories.add(source_category)
+            display_category = source_category.replace('_', ' ').title()
             doc_count += 1
             
             # Format based on document type
             doc_type = doc.metadata.get('type', 'text')
             
             if 'link' in doc_type:
-                response_parts.append(self._format_link_response(doc, source_category))
+                response_parts.append(self._format_link_response(doc, display_category))
             elif 'table' in doc_type or 'statistical' in doc_type:
-                response_parts.append(self._format_data_response(doc, source_category))
+                response_parts.append(self._format_data_response(doc, display_category))
             elif 'procedural' in doc_type:
-                response_parts.append(self._format_procedural_response(doc, source_category))
+                response_parts.append(self._format_procedural_response(doc, display_category))
             else:
-                response_parts.append(self._format_text_response(doc, source_category))
+                response_parts.append(self._format_text_response(doc, display_category))
         
         if response_parts:
             return "\n\n".join(response_parts)
         else:
             return ""
     
-    def _format_link_response(self, doc: Document, category: str) -> str:
+    def _format_link_response(self, doc: Document, display_category: str) -> str:
         """Format a link response with proper markdown"""
         title = doc.metadata.get('title', 'Resources')
         text = doc.text
         
         # Extract links using regex
-        links = re.findall(r'- (.+?): (https?://\S+)', text)
-        
-        response = f"## {title}\n\n"
+        links = _LINK_RE.findall(text)
         
         # Extract the main content (question and answer)
-        main_content = re.split(r'\n\n- ', text, 1)[0]
-        response += f"{main_content}\n\n"
+        main_content = _LINK_LIST_START_RE.split(text, 1)[0]
+        response = [f"## {title}\n\n{main_content}\n\n"]
         
         if links:
-            response += "### Relevant Resources\n\n"
-            for link_name, link_url in links:
-                response += f"* [{link_name}]({link_url})\n"
+            response.append("### Relevant Resources\n\n")
+            response.extend(f"* [{link_name}]({link_url})\n" for link_name, link_url in links)
         
-        response += f"\n*Source: ALU {category.replace('_', ' ').title()}*"
-        return response
+        response.append(f"\n*Source: ALU {display_category}*")
+        return "".join(response)
     
-    def _format_data_response(self, doc: Document, category: str) -> str:
+    def _format_data_response(self, doc: Document, display_category: str) -> str:
         """Format a data/statistical response with proper markdown tables"""
         title = doc.metadata.get('title', 'Information')
         text = doc.text
         
-        response = f"## {title}\n\n"
-        
         # Split into sections
-        parts = text.split("\n\n")
+        parts = text.split("\n\n", 2)
         
         # Add main text
-        if parts and len(parts) > 1:
-            response += f"{parts[0]}\n\n{parts[1]}\n\n"
+        if len(parts) > 1:
+            response = [f"## {title}\n\n{parts[0]}\n\n{parts[1]}\n\n"]
         else:
-            response += f"{text}\n\n"
+            response = [f"## {title}\n\n{text}\n\n"]
         
         # Look for table data
-        table_match = re.search(r"Table data:\n([\s\S]+)", text)
+        table_match = _TABLE_DATA_RE.search(text)
         if table_match:
             table_text = table_match.group(1)
             rows = table_text.strip().split("\n")
             
             # Create markdown table
-            if rows:
-                headers = rows[0].strip().replace("  ", "").split(", ")
-                response += "| " + " | ".join(headers) + " |\n"
-                response += "| " + " | ".join(["---" for _ in headers]) + " |\n"
-                
-                for row in rows[1:]:
-                    cells = row.strip().replace("  ", "").split(", ")
-                    response += "| " + " | ".join(cells) + " |\n"
-        
-        response += f"\n*Source: ALU {category.replace('_', ' ').title()}*"
-        return response
+            headers = rows[0].strip().replace("  ", "").split(", ")
+            response.append("| " + " | ".join(headers) + " |\n")
+            response.append("| " + " | ".join(["---"] * len(headers)) + " |\n")
+            response.extend(
+                "| " + " | ".join(row.strip().replace("  ", "").split(", ")) + " |\n"
+                for row in rows[1:]
+            )
+        
+        response.append(f"\n*Source: ALU {display_category}*")
+        return "".join(response)
     
-    def _format_procedural_response(self, doc: Document, category: str) -> str:
+    def _format_procedural_response(self, doc: Document, display_category: str) -> str:
         """Format a procedural response with numbered steps"""
         title = doc.metadata.get('title', 'Process')
         text = doc.text
         
-        response = f"## {title}\n\n"
-        
         # Extract the main content and steps
-        parts = text.split("\n\n")
+        parts = text.split("\n\n", 2)
         if len(parts) >= 2:
-            response += f"{parts[0]}\n\n{parts[1]}\n\n"
+            main_content = f"{parts[0]}\n\n{parts[1]}"
         else:
-            response += f"{parts[0]}\n\n"
+            main_content = parts[0]
         
         # Extract numbered steps if present
-        steps_match = re.search(r"\n(\d+\..+(?:\n\d+\..+)*)", text)
-        if steps_match:
-            steps = steps_match.group(1)
-            response += "### Steps\n\n" + steps + "\n\n"
+        steps_match = _NUMBERED_STEPS_RE.search(text)
+        steps = f"### Steps\n\n{steps_match.group(1)}\n\n" if steps_match else ""
         
-        response += f"\n*Source: ALU {category.replace('_', ' ').title()}*"
-        return response
+        return (
+            f"## {title}\n\n{main_content}\n\n{steps}"
+            f"\n*Source: ALU {display_category}*"
+        )
     
-    def _format_text_response(self, doc: Document, category: str) -> str:
+    def _format_text_response(self, doc: Document, display_category: str) -> str:
         """Format a general text response"""
         title = doc.metadata.get('title', 'Information')
         text = doc.text
         
         # Split the text by question/answer if possible
         parts = text.split("\n\n", 1)
+        answer = parts[1] if len(parts) > 1 else text
         
-        response = f"## {title}\n\n"
-        
-        if len(parts) > 1:
-            answer = parts[1]
-            response += f"{answer}\n\n"
-        else:
-            response += f"{text}\n\n"
-        
-        response += f"\n*Source: ALU {category.replace('_', ' ').title()}*"
-        return response
+        return f"## {title}\n\n{answer}\n\n\n*Source: ALU {display_category}*"
     
     def _generate_general_response(self, query: str, context: List[Document], role: str) -> str:
         """Generate a response using non-ALU Brain context with a friendly tone"""
@@ -224,8 +254,7 @@ class ResponseGenerator:
         # Try to extract useful information from context
         if context:
             # Get the most relevant document
-            context.sort(key=lambda x: x.score if x.score is not None else 0, reverse=True)
-            best_doc = context[0]
+            best_doc = max(context, key=_doc_score)
             
             # REMOVED: No more "About Your Query" heading
             # Instead, use a friendly opener based on the query content
@@ -233,33 +262,18 @@ class ResponseGenerator:
             # Extract most relevant content
             content = best_doc.text[:400]  # Limit length
             
-            # Create friendly opening based on query content
-            if "graduation" in query_lower:
-                opener = "🎓 Congratulations on your journey toward graduation! "
-            elif "course" in query_lower or "class" in query_lower:
-                opener = "📚 Ready to dive into some exciting learning? "
-            elif "campus" in query_lower:
-                opener = "🏫 Our beautiful campuses are waiting for you! "
-            elif "scholarship" in query_lower or "financial" in query_lower:
-                opener = "💰 Let's make your education more affordable! "
-            elif "deadline" in query_lower:
-                opener = "⏰ Don't worry, I've got the important dates for you! "
-            elif "faculty" in query_lower or "professor" in query_lower:
-                opener = "👨‍🏫 Our amazing faculty members are here to support you! "
-            elif "help" in query_lower or "confused" in query_lower:
-                opener = "🤗 We've all been there! Let me help clear things up: "
-            elif "thank" in query_lower:
-                opener = "😊 You're very welcome! Here's what you asked about: "
+            # Create friendly opening based on query content; when several
+            # topics are mentioned, the one listed first in _TOPIC_OPENERS wins.
+            # No keyword is shorter than 4 characters, so tiny queries skip the scan.
+            topics = (
+                [_OPENER_TOPICS[keyword] for keyword in _OPENER_KEYWORD_RE.findall(query_lower)]
+                if len(query_lower) >= 4 else []
+            )
+            if topics:
+                opener = _TOPIC_OPENERS[min(topics)][1]
             else:
                 # Use rotating friendly openers for general queries
-                friendly_openers = [
-                    "✨ Great question! ",
-                    "🔍 I found just what you're looking for! ",
-                    "💡 Here's something helpful: ",
-                    "🌟 I'm happy to share this with you: ",
-                    "🚀 Let's explore this together: "
-                ]
-                opener = random.choice(friendly_openers)
+                opener = random.choice(_FRIENDLY_OPENERS)
             
             response = f"{opener}{content}"
             
@@ -334,22 +348,27 @@ class ResponseGenerator:
         
         return random.choice(closings)
     
-    def _get_from_cache(self, key: str) -> Optional[str]:
+    def _get_from_cache(self, key: bytes) -> Optional[str]:
         """Retrieve response from cache if not expired"""
-        if key in self.response_cache:
-            timestamp, response = self.response_cache[key]
-            if time.time() - timestamp < self.cache_ttl:
-                return response
-        return None
+        with self._cache_lock:
+            entry = self.response_cache.get(key)
+            if entry is None:
+                return None
+            
+            timestamp, response = entry
+            if time.time() - timestamp >= self.cache_ttl:
+                del self.response_cache[key]
+                return None
+            
+            self.response_cache.move_to_end(key)
+            return response
     
-    def _add_to_cache(self, key: str, response: str) -> None:
+    def _add_to_cache(self, key: bytes, response: str) -> None:
         """Add response to cache with timestamp"""
-        self.response_cache[key] = (time.time(), response)
-        
-        # Clean up old cache entries if cache gets too large
-        if len(self.response_cache) > 100:
-            now = time.time()
-            expired_keys = [k for k, v in self.response_cache.items() 
-                           if now - v[0] > self.cache_ttl]
-            for k in expired_keys:
-                del self.response_cache[k]
+        with self._cache_lock:
+            self.response_cache[key] = (time.time(), response)
+            self.response_cache.move_to_end(key)
+            
+            # Evict least recently used entries once the cache is full
+            while len(self.response_cache) > self.cache_size:
+                self.response_cache.popitem(last=False)
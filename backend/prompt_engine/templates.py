@@ -1,5 +1,6 @@
 
 import os
+import re
 from pathlib import Path
 from typing import Dict
 
@@ -65,11 +66,21 @@ Provide a detailed response with teaching recommendations, resource suggestions,
 """
 }
 
+# Query category keywords, matched anywhere in the query like a substring
+# test ("information" counts as administrative through "form")
+_ACADEMIC_RE = re.compile(
+    r"course|assignment|exam|study|learn|class|lecture|professor|grade|academic"
+)
+_ADMIN_RE = re.compile(
+    r"register|enrollment|tuition|deadline|policy|form|application|schedule|payment|administrative"
+)
+
 class PromptTemplateManager:
     """Manages loading and accessing prompt templates"""
     
     def __init__(self):
         self._initialize_prompt_templates()
+        self._templates = self._load_prompt_templates()
     
     def _initialize_prompt_templates(self):
         """Initialize prompt templates"""
@@ -80,6 +91,19 @@ class PromptTemplateManager:
                 with open(prompt_path, "w") as f:
                     f.write(template)
     
+    def _load_prompt_templates(self) -> Dict[str, str]:
+        """Read every prompt template once, so requests don't touch the disk"""
+        templates = {}
+        for prompt_type, default_template in DEFAULT_PROMPTS.items():
+            prompt_path = PROMPTS_DIR / f"{prompt_type}_prompt.txt"
+            if prompt_path.exists():
+                with open(prompt_path, "r") as f:
+                    templates[prompt_type] = f.read()
+            else:
+                # Fall back to default template
+                templates[prompt_type] = default_template
+        return templates
+    
     def get_prompt_template(self, role: str = "student", query: str = "") -> str:
         """Get the appropriate prompt template based on user role and query"""
         # Map roles to prompt types
@@ -93,33 +117,23 @@ class PromptTemplateManager:
         if role == "student" and "academic" in self._query_category(query):
             prompt_type = "academic"
             
-        # Load the prompt template
-        prompt_path = PROMPTS_DIR / f"{prompt_type}_prompt.txt"
-        if prompt_path.exists():
-            with open(prompt_path, "r") as f:
-                return f.read()
-        else:
-            # Fall back to default template
-            return DEFAULT_PROMPTS.get(prompt_type, DEFAULT_PROMPTS["general"])
+        return self._templates.get(prompt_type, self._templates["general"])
     
     def _query_category(self, query: str) -> list:
         """Simple categorization of queries"""
         categories = []
         
-        # Academic keywords
-        academic_keywords = ["course", "assignment", "exam", "study", "learn", 
-                           "class", "lecture", "professor", "grade", "academic"]
-        
-        # Administrative keywords
-        admin_keywords = ["register", "enrollment", "tuition", "deadline", "policy", 
-                         "form", "application", "schedule", "payment", "administrative"]
-        
         # Simple keyword matching
         query_lower = query.lower()
-        if any(keyword in query_lower for keyword in academic_keywords):
+        
+        # No keyword is shorter than 4 characters, so very short queries can't match
+        if len(query_lower) < 4:
+            return ["general"]
+            
+        if _ACADEMIC_RE.search(query_lower):
             categories.append("academic")
             
-        if any(keyword in query_lower for keyword in admin_keywords):
+        if _ADMIN_RE.search(query_lower):
             categories.append("administrative")
             
         if not categories:
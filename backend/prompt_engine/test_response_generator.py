@@ -0,0 +1,38 @@
+import os
+import sys
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+from prompt_engine.response_generator import ResponseGenerator
+
+def test_cache_hit():
+    generator = ResponseGenerator()
+    generator._add_to_cache(b"key", "response")
+    assert generator._get_from_cache(b"key") == "response"
+    assert generator._get_from_cache(b"missing") is None
+
+def test_cache_ttl():
+    generator = ResponseGenerator()
+    # Stored exactly one TTL ago, so it has just expired
+    generator.response_cache[b"key"] = (time.time() - generator.cache_ttl, "response")
+    
+    assert generator._get_from_cache(b"key") is None
+    assert b"key" not in generator.response_cache
+
+def test_cache_lru_eviction():
+    generator = ResponseGenerator()
+    generator.cache_size = 2
+    
+    generator._add_to_cache(b"a", "A")
+    generator._add_to_cache(b"b", "B")
+    # Reading "a" makes "b" the least recently used
+    assert generator._get_from_cache(b"a") == "A"
+    generator._add_to_cache(b"c", "C")
+    
+    assert list(generator.response_cache) == [b"a", b"c"]
+    assert generator._get_from_cache(b"b") is None
+
+if __name__ == "__main__":
+    for test in (test_cache_hit, test_cache_ttl, test_cache_lru_eviction):
+        test()
+        print(f"{test.__name__}: passed")
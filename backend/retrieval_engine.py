@@ -2,12 +2,14 @@
 import os
 import json
 from pathlib import Path
+from functools import lru_cache
 from typing import List, Dict, Any, Optional
 import numpy as np
+import torch
 
 # For vector storage and retrieval
 import chromadb
-from chromadb.utils import embedding_functions
+from chromadb.api.types import Documents, EmbeddingFunction, Embeddings
 from sentence_transformers import SentenceTransformer
 
 # Create necessary directories
@@ -21,6 +23,77 @@ VECTOR_DB_DIR.mkdir(parents=True, exist_ok=True)
 MAX_CHUNK_SIZE = 1000  # characters
 MAX_CHUNK_OVERLAP = 200  # characters
 
+# Sources of ALU Brain knowledge are named "ALU Brain: <category>"
+ALU_BRAIN_SOURCE_PREFIX = "ALU Brain: "
+
+# Chunks embedded per forward pass when indexing
+EMBEDDING_BATCH_SIZE = 64
+
+# Preferred chunk boundaries, best first
+CHUNK_BREAK_POINTS = ('\n\n', '\n', '. ', ' ')
+
+# Sentence embedding model, shared by the engine and its Chroma collection
+EMBEDDING_MODEL_NAME = 'all-MiniLM-L6-v2'
+_embedding_model = None
+
+# Opt-in int8 quantization of the embedding model on CPU. Its retrieval
+# quality hasn't been measured against fp32, so it's off by default.
+QUANTIZE_EMBEDDINGS = os.getenv("QUANTIZE_EMBEDDINGS", "False").lower() in ("1", "true", "yes")
+
+def get_embedding_model() -> SentenceTransformer:
+    """
+    Load the sentence embedding model on first use and return the shared instance.
+    
+    On GPU the model runs in fp16. On CPU it runs in fp32, or with its Linear
+    layers dynamically quantized to int8 if QUANTIZE_EMBEDDINGS is set.
+    """
+    global _embedding_model
+    
+    if _embedding_model is None:
+        model = SentenceTransformer(EMBEDDING_MODEL_NAME)
+        if model.device.type == "cuda":
+            model.half()
+        elif QUANTIZE_EMBEDDINGS:
+            model = torch.ao.quantization.quantize_dynamic(model, {torch.nn.Linear}, dtype=torch.qint8)
+        _embedding_model = model
+    
+    return _embedding_model
+
+def embedding_precision() -> str:
+    """Precision the shared embedding model runs at: fp16, int8 or fp32"""
+    model = get_embedding_model()
+    if model.device.type == "cuda":
+        return "fp16"
+    return "int8" if QUANTIZE_EMBEDDINGS else "fp32"
+
+# Chroma client, shared by every RetrievalEngine in this process
+_chroma_client = None
+
+def get_chroma_client():
+    """Open the persistent Chroma client on first use and return the shared instance"""
+    global _chroma_client
+    
+    if _chroma_client is None:
+        _chroma_client = chromadb.PersistentClient(path=str(VECTOR_DB_DIR))
+    
+    return _chroma_client
+
+class SharedModelEmbeddingFunction(EmbeddingFunction):
+    """Chroma embedding function that reuses the shared model instead of loading its own copy"""
+    def __call__(self, input: Documents) -> Embeddings:
+        return get_embedding_model().encode(list(input), convert_to_numpy=True).tolist()
+
+def brain_source_metadata(source: str) -> Dict[str, Any]:
+    """
+    Tag a source as ALU Brain knowledge or not, so the response generator
+    doesn't have to parse the source string for every query.
+    """
+    is_brain = source.startswith(ALU_BRAIN_SOURCE_PREFIX)
+    return {
+        "is_brain": is_brain,
+        "brain_category": source[len(ALU_BRAIN_SOURCE_PREFIX):] if is_brain else "",
+    }
+
 class Document:
     """Simple document class to store text and metadata"""
     def __init__(self, text: str, metadata: Dict[str, Any], score: Optional[float] = None):
@@ -37,16 +110,15 @@ class RetrievalEngine:
     """
 
     def __init__(self):
-        # Initialize the embedding model
-        self.embedding_model = SentenceTransformer('all-MiniLM-L6-v2')
+        # Initialize the embedding model, warming it up so the first query isn't slow
+        self.embedding_model = get_embedding_model()
+        self.embedding_model.encode("warm up")
         
         # Initialize ChromaDB
-        self.client = chromadb.PersistentClient(path=str(VECTOR_DB_DIR))
+        self.client = get_chroma_client()
         
         # Create or get the collection
-        self.embedding_function = embedding_functions.SentenceTransformerEmbeddingFunction(
-            model_name='all-MiniLM-L6-v2'
-        )
+        self.embedding_function = SharedModelEmbeddingFunction()
         
         try:
             self.collection = self.client.get_collection(
@@ -57,13 +129,38 @@ class RetrievalEngine:
         except ValueError:
             self.collection = self.client.create_collection(
                 name="alu_documents",
-                embedding_function=self.embedding_function
+                embedding_function=self.embedding_function,
+                metadata={"embedding_precision": embedding_precision()}
             )
             print("Created new vector collection")
         
-        # Initialize document processor reference
-        from document_processor import DocumentProcessor
-        self.document_processor = DocumentProcessor()
+        # Query embeddings, so repeated questions skip the model forward pass
+        self._embed_query = lru_cache(maxsize=512)(self._encode_query)
+        
+        # Document processor, created when indexing first needs it
+        self._document_processor = None
+        
+        # Vectors from a model at another precision don't compare cleanly with
+        # this model's queries; collections from before the tag are fp32
+        indexed_precision = (self.collection.metadata or {}).get("embedding_precision", "fp32")
+        if indexed_precision != embedding_precision():
+            if self.collection.count() == 0:
+                self.collection.modify(metadata={"embedding_precision": embedding_precision()})
+            else:
+                print(f"Vector index was built at {indexed_precision}, model runs at {embedding_precision()}; rebuilding")
+                self.rebuild_index()
+
+    @property
+    def document_processor(self):
+        """Document processor reference, loaded on first use so query-only workers skip it"""
+        if self._document_processor is None:
+            from document_processor import DocumentProcessor
+            self._document_processor = DocumentProcessor()
+        return self._document_processor
+
+    def _encode_query(self, query: str) -> tuple:
+        """Embed a normalized query the same way the collection embeds text"""
+        return tuple(self.embedding_model.encode(query).tolist())
 
     def _chunk_text(self, text: str, chunk_size: int = MAX_CHUNK_SIZE, chunk_overlap: int = MAX_CHUNK_OVERLAP) -> List[str]:
         """Split text into chunks with overlap"""
@@ -81,7 +178,7 @@ class RetrievalEngine:
             # If we're not at the end of the text, try to find a good breaking point
             if end < text_length:
                 # Look for a newline or period near the end
-                for break_point in ['\n\n', '\n', '. ', ' ']:
+                for break_point in CHUNK_BREAK_POINTS:
                     last_break = text.rfind(break_point, start, end)
                     if last_break != -1:
                         end = last_break + len(break_point)
@@ -90,59 +187,94 @@ class RetrievalEngine:
             # Add the chunk
             chunks.append(text[start:end])
             
-            # Move the start position for the next chunk, considering overlap
-            start = end - chunk_overlap if end < text_length else end
+            # Move the start position for the next chunk, considering overlap.
+            # A break close to the start leaves no room for overlap; carry on
+            # from the end instead of stepping back over the same text forever.
+            next_start = end - chunk_overlap
+            start = next_start if end < text_length and next_start > start else end
         
         return chunks
 
+    def _prepare_chunks(self, doc_id: str, all_metadata: Dict[str, Any]):
+        """
+        Chunk a document for the vector store.
+        
+        Returns (chunks, chunk ids, chunk metadatas), or None if the
+        document's text or metadata is missing.
+        """
+        # Get document text
+        doc_text = self.document_processor.get_document_text(doc_id)
+        if not doc_text:
+            print(f"Document text not found for ID: {doc_id}")
+            return None
+        
+        if doc_id not in all_metadata:
+            print(f"Document metadata not found for ID: {doc_id}")
+            return None
+            
+        metadata = all_metadata[doc_id]
+        source = metadata.get("source", "Unknown")
+        brain_metadata = brain_source_metadata(source)
+        
+        # Chunk the document
+        chunks = self._chunk_text(doc_text)
+        
+        # Prepare for batch add
+        doc_ids = []
+        metadatas = []
+        
+        for i, chunk in enumerate(chunks):
+            chunk_id = f"{doc_id}_chunk_{i}"
+            doc_ids.append(chunk_id)
+            
+            # Create metadata for the chunk
+            chunk_metadata = {
+                "doc_id": doc_id,
+                "chunk_id": i,
+                "title": metadata.get("title", "Untitled"),
+                "source": source,
+                "chunk_index": i,
+                "total_chunks": len(chunks),
+                **brain_metadata,
+            }
+            metadatas.append(chunk_metadata)
+        
+        return chunks, doc_ids, metadatas
+
+    def _add_chunks(self, chunks: List[str], doc_ids: List[str], metadatas: List[Dict[str, Any]]):
+        """Embed chunks in batches and add them to the collection in as few calls as Chroma allows"""
+        batch_size = self.client.max_batch_size
+        for start in range(0, len(chunks), batch_size):
+            end = start + batch_size
+            embeddings = self.embedding_model.encode(
+                chunks[start:end],
+                batch_size=EMBEDDING_BATCH_SIZE,
+                show_progress_bar=False,
+                convert_to_numpy=True
+            ).tolist()
+            self.collection.add(
+                documents=chunks[start:end],
+                embeddings=embeddings,
+                ids=doc_ids[start:end],
+                metadatas=metadatas[start:end]
+            )
+
     def update_vector_store(self, doc_id: str):
         """Process and add a document to the vector store"""
         try:
-            # Get document text
-            doc_text = self.document_processor.get_document_text(doc_id)
-            if not doc_text:
-                print(f"Document text not found for ID: {doc_id}")
-                return False
-            
             # Get document metadata
             with open(METADATA_FILE, "r") as f:
                 all_metadata = json.load(f)
             
-            if doc_id not in all_metadata:
-                print(f"Document metadata not found for ID: {doc_id}")
+            prepared = self._prepare_chunks(doc_id, all_metadata)
+            if prepared is None:
                 return False
-                
-            metadata = all_metadata[doc_id]
             
-            # Chunk the document
-            chunks = self._chunk_text(doc_text)
-            
-            # Prepare for batch add
-            doc_ids = []
-            metadatas = []
-            
-            for i, chunk in enumerate(chunks):
-                chunk_id = f"{doc_id}_chunk_{i}"
-                doc_ids.append(chunk_id)
-                
-                # Create metadata for the chunk
-                chunk_metadata = {
-                    "doc_id": doc_id,
-                    "chunk_id": i,
-                    "title": metadata.get("title", "Untitled"),
-                    "source": metadata.get("source", "Unknown"),
-                    "chunk_index": i,
-                    "total_chunks": len(chunks),
-                }
-                metadatas.append(chunk_metadata)
+            chunks, doc_ids, metadatas = prepared
             
             # Add to the collection
             if chunks:
-                self.collection.add(
-                    documents=chunks,
-                    ids=doc_ids,
-                    metadatas=metadatas
-                )
+                self._add_chunks(chunks, doc_ids, metadatas)
                 print(f"Added {len(chunks)} chunks from document {doc_id}")
                 return True
             
@@ -160,10 +292,9 @@ class RetrievalEngine:
                 where={"doc_id": doc_id}
             )
             
-            # Delete the chunks
+            # Delete the chunks in a single call
             if results and results.get("ids"):
-                for chunk_id in results["ids"]:
-                    self.collection.delete(chunk_id)
+                self.collection.delete(ids=results["ids"])
                 
                 print(f"Removed {len(results['ids'])} chunks for document {doc_id}")
                 return True
@@ -185,9 +316,25 @@ class RetrievalEngine:
             with open(METADATA_FILE, "r") as f:
                 all_metadata = json.load(f)
             
-            # Add each document
+            # Chunk every document, then add them all together
+            all_chunks = []
+            all_ids = []
+            all_metadatas = []
             for doc_id in all_metadata.keys():
-                self.update_vector_store(doc_id)
+                prepared = self._prepare_chunks(doc_id, all_metadata)
+                if prepared is None:
+                    continue
+                chunks, doc_ids, metadatas = prepared
+                all_chunks.extend(chunks)
+                all_ids.extend(doc_ids)
+                all_metadatas.extend(metadatas)
+            
+            if all_chunks:
+                self._add_chunks(all_chunks, all_ids, all_metadatas)
+                print(f"Added {len(all_chunks)} chunks")
+            
+            # Record the precision the index was rebuilt at
+            self.collection.modify(metadata={"embedding_precision": embedding_precision()})
             
             print(f"Rebuilt vector index with {len(all_metadata)} documents")
             return True
@@ -204,8 +351,9 @@ class RetrievalEngine:
         """
         try:
             # Query the collection
+            query_embedding = list(self._embed_query(query.strip().lower()))
             results = self.collection.query(
-                query_texts=[query],
+                query_embeddings=[query_embedding],
                 n_results=top_k
             )
             
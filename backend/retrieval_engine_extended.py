@@ -1,7 +1,10 @@
 
-from retrieval_engine import RetrievalEngine, Document
+from retrieval_engine import RetrievalEngine, Document, ALU_BRAIN_SOURCE_PREFIX
 from alu_brain import ALUBrainManager
 from typing import List, Dict, Any, Optional
+from collections import OrderedDict
+import heapq
+import threading
 import time
 
 class ExtendedRetrievalEngine(RetrievalEngine):
@@ -13,8 +16,12 @@ class ExtendedRetrievalEngine(RetrievalEngine):
     def __init__(self):
         super().__init__()
         self.alu_brain = ALUBrainManager()
-        self._cache = {}  # Simple in-memory cache
+        # (query, role) -> (timestamp, results), oldest first
+        self._cache = OrderedDict()
         self._cache_ttl = 300  # Cache TTL in seconds (5 minutes)
+        self._cache_size = 1024
+        # Requests are served from a threadpool; guards every _cache access
+        self._cache_lock = threading.Lock()
         print("Extended Retrieval Engine initialized with ALU Brain integration and performance optimizations")
     
     def retrieve_context(self, query: str, role: str = "student", **kwargs):
@@ -23,10 +30,12 @@ class ExtendedRetrievalEngine(RetrievalEngine):
         using intelligent merging based on relevance scores
         """
         # Check cache first for improved performance
-        cache_key = f"{query}:{role}"
-        cached_result = self._get_from_cache(cache_key)
-        if cached_result:
-            return cached_result
+        # (expired entries are simply overwritten below)
+        cache_key = (query, role)
+        with self._cache_lock:
+            cached = self._cache.get(cache_key)
+        if cached is not None and cached[1] and time.time() - cached[0] < self._cache_ttl:
+            return cached[1]
             
         # Get results from the original vector store (parent class)
         vector_results = super().retrieve_context(query, role, **kwargs)
@@ -37,9 +46,7 @@ class ExtendedRetrievalEngine(RetrievalEngine):
         # Process ALU Brain results if available
         brain_documents = []
         if brain_results:
-            brain_context = self.alu_brain.format_for_context(brain_results)
-            
-            for i, result in enumerate(brain_results):
+            for result in brain_results:
                 entry = result['entry']
                 category = result['category']
                 
@@ -52,13 +59,16 @@ class ExtendedRetrievalEngine(RetrievalEngine):
                 text = self._format_entry_content(entry, question, answer, entry_type)
                 
                 # Create Document object
+                display_category = category.replace('_', ' ').title()
                 doc = Document(
                     text=text,
                     metadata={
-                        'title': question or f"ALU {category.replace('_', ' ').title()} Knowledge",
-                        'source': f"ALU Brain: {category.replace('_', ' ').title()}",
+                        'title': question or f"ALU {display_category} Knowledge",
+                        'source': f"{ALU_BRAIN_SOURCE_PREFIX}{display_category}",
                         'type': entry_type,
-                        'score': result.get('score', 0)
+                        'score': result.get('score', 0),
+                        'is_brain': True,
+                        'brain_category': display_category
                     }
                 )
                 brain_documents.append(doc)
@@ -67,7 +77,11 @@ class ExtendedRetrievalEngine(RetrievalEngine):
         merged_results = self._merge_results(vector_results, brain_documents)
         
         # Store in cache
-        self._store_in_cache(cache_key, merged_results)
+        now = time.time()
+        with self._cache_lock:
+            self._cache[cache_key] = (now, merged_results)
+            self._cache.move_to_end(cache_key)
+            self._expire_cache(now)
         
         return merged_results
     
@@ -75,32 +89,29 @@ class ExtendedRetrievalEngine(RetrievalEngine):
         """Helper method to format entry content based on type"""
         if entry_type == 'link_response' and 'links' in entry:
             links_text = "\n".join([f"- {link.get('text', '')}: {link.get('url', '')}" 
-                                  for link in entry.get('links', [])])
+                                  for link in entry['links']])
             return f"{question}\n\n{answer}\n\n{links_text}"
         
         elif entry_type == 'table_response' and 'table' in entry:
-            table = entry.get('table', {})
+            table = entry['table']
             if 'headers' in table and 'rows' in table:
                 # Simple text representation of the table
-                table_text = "Table data:\n"
-                for row in table.get('rows', []):
-                    table_text += f"  {', '.join(row)}\n"
+                table_text = "Table data:\n" + "".join([f"  {', '.join(row)}\n" for row in table['rows']])
                 return f"{question}\n\n{answer}\n\n{table_text}"
             else:
                 return f"{question}\n\n{answer}"
         
-        elif entry_type in ['statistical_response', 'date_response', 'procedural_response']:
+        elif entry_type in ('statistical_response', 'date_response', 'procedural_response'):
             # For these types, include the specialized content
             special_content = ""
             if 'statistics' in entry:
                 special_content = "\n".join([f"- {stat.get('metric', '')}: {stat.get('value', '')}" 
-                                           for stat in entry.get('statistics', [])])
+                                           for stat in entry['statistics']])
             elif 'dates' in entry:
                 special_content = "\n".join([f"- {date.get('round', '')}: {date.get('deadline', '')}" 
-                                           for date in entry.get('dates', [])])
+                                           for date in entry['dates']])
             elif 'steps' in entry:
-                steps = entry.get('steps', [])
-                special_content = "\n".join([f"{i+1}. {step}" for i, step in enumerate(steps)])
+                special_content = "\n".join([f"{i}. {step}" for i, step in enumerate(entry['steps'], 1)])
             
             return f"{question}\n\n{answer}\n\n{special_content}"
         
@@ -112,69 +123,45 @@ class ExtendedRetrievalEngine(RetrievalEngine):
         """
         Intelligently merge vector and brain results based on relevance and diversity
         """
-        # Start with all vector results
-        all_results = list(vector_results)
-        
         # If no brain results, just return vector results
         if not brain_results:
-            return all_results
+            return list(vector_results)
             
         # If no vector results, just return brain results
         if not vector_results:
             return brain_results
         
-        # Sort both lists by score
-        vector_results.sort(key=lambda x: x.score if x.score is not None else 0, reverse=True)
-        brain_results.sort(key=lambda x: x.metadata.get('score', 0), reverse=True)
+        # Rank brain results by score; at most 9 of them are used. Vector
+        # results are already ranked by distance, and the two scores aren't
+        # on a comparable scale, so each list keeps its own order.
+        brain_results = heapq.nlargest(9, brain_results, key=lambda x: x.metadata.get('score', 0))
         
-        # Take the top result from brain results and insert at position 2
-        if brain_results:
-            top_brain = brain_results.pop(0)
-            if len(all_results) >= 1:
-                all_results.insert(1, top_brain)
-            else:
-                all_results.append(top_brain)
+        # Best vector match first, then the top brain result, then
+        # interleave the rest pairwise (brain, vector)
+        merged = [vector_results[0], brain_results[0]]
+        pairs = min(len(vector_results), len(brain_results))
+        for i in range(1, pairs):
+            merged.append(brain_results[i])
+            merged.append(vector_results[i])
         
-        # Interleave remaining results (optimized algorithm)
-        remaining = []
-        while brain_results and len(remaining) < 8:  # Limit to prevent too many results
-            # Take one from brain
-            if brain_results:
-                remaining.append(brain_results.pop(0))
-            
-        # Add remaining interleaved results
-        i = 2  # Start after the first vector result and the top brain result
-        for doc in remaining:
-            if i < len(all_results):
-                all_results.insert(i, doc)
-                i += 2  # Skip every other position
-            else:
-                all_results.append(doc)
+        # Whichever list is longer supplies the rest
+        merged.extend(vector_results[pairs:])
+        merged.extend(brain_results[pairs:])
         
         # Ensure we don't return too many results (limit to 10)
-        return all_results[:10]
-        
-    def _get_from_cache(self, key):
-        """Get result from cache if it exists and hasn't expired"""
-        if key in self._cache:
-            entry = self._cache[key]
-            if time.time() - entry['timestamp'] < self._cache_ttl:
-                return entry['data']
-        return None
-        
-    def _store_in_cache(self, key, data):
-        """Store result in cache with current timestamp"""
-        self._cache[key] = {
-            'data': data,
-            'timestamp': time.time()
-        }
-        
-        # Clean up old cache entries
-        self._clean_cache()
+        return merged[:10]
+    
+    def _expire_cache(self, now: float):
+        """
+        Drop expired entries, and the oldest entries if the cache is full.
         
-    def _clean_cache(self):
-        """Remove expired cache entries"""
-        now = time.time()
-        expired_keys = [k for k, v in self._cache.items() if now - v['timestamp'] > self._cache_ttl]
-        for key in expired_keys:
-            del self._cache[key]
+        Entries are kept in the order they were stored, so expired ones are
+        always at the front and cleanup never has to look past the first
+        live entry. Callers must hold _cache_lock.
+        """
+        while self._cache:
+            oldest_key = next(iter(self._cache))
+            timestamp, _ = self._cache[oldest_key]
+            if now - timestamp <= self._cache_ttl and len(self._cache) <= self._cache_size:
+                break
+            del self._cache[oldest_key]
@@ -0,0 +1,43 @@
+import os
+import sys
+
+sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
+from retrieval_engine import RetrievalEngine
+
+def _engine():
+    # Built without __init__ so no model or vector store is loaded
+    return RetrievalEngine.__new__(RetrievalEngine)
+
+def test_chunk_text_covers_text():
+    text = "First sentence here. " * 200
+    
+    chunks = _engine()._chunk_text(text, chunk_size=100, chunk_overlap=20)
+    
+    assert chunks
+    assert all(len(chunk) <= 100 for chunk in chunks)
+    assert text.startswith(chunks[0])
+    assert text.endswith(chunks[-1])
+
+def test_chunk_text_terminates_with_early_breaks():
+    # A break closer to the chunk start than the overlap used to step back
+    # to the same start forever
+    cases = [
+        ("a.\n" + "x" * 500, 100, 50),
+        ("\n".join("y" * 10 for _ in range(300)), 40, 35),
+        ("no breaks at all " * 100, 50, 49),
+        ("z" * 1000, 100, 100),
+    ]
+    
+    for text, chunk_size, chunk_overlap in cases:
+        chunks = _engine()._chunk_text(text, chunk_size=chunk_size, chunk_overlap=chunk_overlap)
+        assert len(chunks) <= len(text)
+        assert text.endswith(chunks[-1])
+
+def test_chunk_text_empty():
+    assert _engine()._chunk_text("") == []
+
+if __name__ == "__main__":
+    for test in (test_chunk_text_covers_text, test_chunk_text_terminates_with_early_breaks,
+                 test_chunk_text_empty):
+        test()
+        print(f"{test.__name__}: passed")
@@ -0,0 +1,44 @@
+import os
+import sys
+
+sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
+from retrieval_engine import Document
+from retrieval_engine_extended import ExtendedRetrievalEngine
+
+def _engine():
+    # Built without __init__ so no model, vector store or ALU Brain is loaded
+    return ExtendedRetrievalEngine.__new__(ExtendedRetrievalEngine)
+
+def _docs(prefix, scores):
+    return [Document(f"{prefix}{i}", {"score": score}, score) for i, score in enumerate(scores)]
+
+def test_merge_results_order():
+    vector = _docs("v", [0.9, 0.8, 0.7])
+    # Brain results arrive unsorted and are ranked by score
+    brain = _docs("b", [0.2, 0.9, 0.5, 0.7])
+    
+    merged = _engine()._merge_results(vector, brain)
+    
+    assert [doc.text for doc in merged] == ["v0", "b1", "b3", "v1", "b2", "v2", "b0"]
+
+def test_merge_results_limits():
+    vector = _docs("v", [0.5] * 8)
+    brain = _docs("b", [i / 20 for i in range(12)])
+    
+    merged = _engine()._merge_results(vector, brain)
+    
+    assert len(merged) == 10
+    # Only the 9 best brain results can be used
+    assert "b0" not in [doc.text for doc in merged]
+
+def test_merge_results_one_source():
+    vector = _docs("v", [0.9, 0.8])
+    brain = _docs("b", [0.1, 0.6])
+    
+    assert _engine()._merge_results(vector, []) == vector
+    assert _engine()._merge_results([], brain) == brain
+
+if __name__ == "__main__":
+    for test in (test_merge_results_order, test_merge_results_limits, test_merge_results_one_source):
+        test()
+        print(f"{test.__name__}: passed")